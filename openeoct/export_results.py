@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+"""
+Script to export openeoct JSON result files into a compact format for analytics,
+with one row per (run, backend, group, endpoint) including the request timing:
+gzip compressed NDJSON by default, or Parquet if pyarrow is installed.
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+
+try:
+    from json2html import read_endpoints
+except ImportError:
+    from openeoct.json2html import read_endpoints
+
+COLUMNS = ["run", "backend", "started", "group", "endpoint", "type", "url", "state", "message",
+           "duration_ms", "size", "retries"]
+NUMBER_COLUMNS = ["duration_ms", "size", "retries"]
+CHUNK_ROWS = 10000
+STATS_TAIL_SIZE = 1 << 16
+
+
+class NdjsonWriter:
+    """
+    Writes the rows as gzip compressed newline delimited JSON.
+    """
+
+    def __init__(self, output_path):
+        self.f = gzip.open(output_path, "wt", encoding="utf-8")
+
+    def write(self, rows):
+        for row in rows:
+            self.f.write(json.dumps(row, separators=(",", ":")))
+            self.f.write("\n")
+
+    def close(self):
+        self.f.close()
+
+
+class ParquetWriter:
+    """
+    Writes the rows as Parquet file, one row group per chunk of rows.
+    """
+
+    def __init__(self, output_path):
+        import pyarrow
+        import pyarrow.parquet
+        self.pa = pyarrow
+        self.schema = pyarrow.schema([
+            (column, pyarrow.int64() if column in NUMBER_COLUMNS else pyarrow.string()) for column in COLUMNS
+        ])
+        self.writer = pyarrow.parquet.ParquetWriter(output_path, self.schema, compression="zstd")
+
+    def write(self, rows):
+        columns = {column: [row.get(column) for row in rows] for column in COLUMNS}
+        self.writer.write_table(self.pa.Table.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def open_writer(output_path, format=None):
+    """
+    Opens a writer for the output path, the format ("ndjson" or "parquet") defaults to the file extension.
+    """
+    if not format:
+        format = "parquet" if output_path.endswith(".parquet") else "ndjson"
+    if format == "parquet":
+        try:
+            return ParquetWriter(output_path)
+        except ImportError:
+            raise SystemExit("The parquet format requires pyarrow, use the ndjson format instead.")
+    return NdjsonWriter(output_path)
+
+
+def write_rows(writer, rows, chunk_rows=CHUNK_ROWS):
+    """
+    Writes the rows in chunks of chunk_rows rows, returns the number of rows written.
+    """
+    count = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            writer.write(chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        writer.write(chunk)
+        count += len(chunk)
+    return count
+
+
+def parse_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def read_stats(input_path):
+    """
+    Reads the stats of a report. openeoct writes them last, so only the tail of the file is parsed,
+    falling back to a full pass if they are not found there.
+    """
+    with open(input_path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - STATS_TAIL_SIZE))
+        tail = f.read().decode("utf-8", errors="ignore")
+    start = tail.rfind('"stats"')
+    if start >= 0:
+        try:
+            pos = tail.index(":", start) + 1
+            while pos < len(tail) and tail[pos] in " \t\r\n":
+                pos += 1
+            stats, _ = json.JSONDecoder().raw_decode(tail, pos)
+            if isinstance(stats, dict):
+                return stats
+        except ValueError:
+            pass
+    endpoints, info = read_endpoints(input_path)
+    for _ in endpoints:
+        pass
+    return info["stats"]
+
+
+def iter_report_rows(input_path):
+    """
+    Streams the rows of a JSON report, the run is named after the file.
+    """
+    stats = read_stats(input_path)
+    run = os.path.splitext(os.path.basename(input_path))[0]
+    backend = stats.get("backend", {}).get("url")
+    started = stats.get("execution", {}).get("start")
+
+    endpoints, _ = read_endpoints(input_path)
+    for group_name, endpoint_name, endpoint in endpoints:
+        yield {
+            "run": run,
+            "backend": backend,
+            "started": started,
+            "group": group_name,
+            "endpoint": endpoint_name,
+            "type": endpoint.get("type"),
+            "url": endpoint.get("url"),
+            "state": endpoint.get("state"),
+            "message": endpoint.get("message"),
+            "duration_ms": parse_int(endpoint.get("duration_ms")),
+            "size": parse_int(endpoint.get("size")),
+            "retries": parse_int(endpoint.get("retries"))
+        }
+
+
+def list_reports(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".json"):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def main(output_path, input_paths, format=None):
+    writer = open_writer(output_path, format)
+    count = 0
+    try:
+        for input_path in list_reports(input_paths):
+            count += write_rows(writer, iter_report_rows(input_path))
+    finally:
+        writer.close()
+    print("{} rows written to {}".format(count, output_path), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--format", choices=["ndjson", "parquet"],
+                        help="output format, defaults to parquet for .parquet files and ndjson otherwise")
+    parser.add_argument("output", help="output file, e.g. results.ndjson.gz or results.parquet")
+    parser.add_argument("reports", nargs="+", help="JSON reports or directories containing them")
+    args = parser.parse_args()
+
+    main(args.output, args.reports, format=args.format)
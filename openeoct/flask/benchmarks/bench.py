@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+"""
+Benchmarks of the hot paths of the web application (gen_endpoints, create_configfile, configs_to_backend,
+read_result, json2html and the main views) at several sizes, against a local fake backend and a scratch database.
+
+The results can be written to a JSON file and compared against the results of an earlier run, e.g.
+
+    ./bench.py --output baseline.json
+    ./bench.py --baseline baseline.json --tolerance 0.25
+
+exits with status 1 if the median time of a benchmark grew by more than the tolerance.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import environment
+
+SIZES = [10, 100, 1000]
+
+
+def measure(func, setup=None, repeat=5):
+    """
+    Runs func repeat times, each after setup, and returns the durations in seconds.
+    """
+    durations = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def bench_gen_endpoints(size, fake_url):
+    from openeoct.flask.webopeneoct import db
+    from openeoct.flask.webopeneoct.models import Endpoint, CapabilitiesSnapshot
+    from openeoct.flask.webopeneoct.service import gen_endpoints
+
+    be_id = environment.add_backends(1, fake_url)[0]
+
+    def setup():
+        # the bulk deletes do not change the backend revision, so the snapshots are dropped as well
+        Endpoint.query.filter(Endpoint.backend == be_id).delete()
+        CapabilitiesSnapshot.query.filter(CapabilitiesSnapshot.backend == be_id).delete()
+        db.session.commit()
+
+    return measure(lambda: gen_endpoints(be_id, re_types=["GET", "POST", "DELETE"], leave_ids=False), setup)
+
+
+def bench_gen_endpoints_unchanged(size, fake_url):
+    from openeoct.flask.webopeneoct.service import gen_endpoints
+
+    be_id = environment.add_backends(1, fake_url)[0]
+    gen_endpoints(be_id, re_types=["GET", "POST", "DELETE"], leave_ids=False)
+
+    # the capabilities are revalidated (304) and nothing is generated
+    return measure(lambda: gen_endpoints(be_id, re_types=["GET", "POST", "DELETE"], leave_ids=False))
+
+
+def bench_create_configfile(size, fake_url):
+    from openeoct.flask.webopeneoct.service import create_configfile, config_revisions
+
+    be_id = environment.add_backends(1, fake_url, endpoints=size)[0]
+
+    # without the cached file of the revision, i.e. after every change of the backend
+    return measure(lambda: create_configfile(be_id), config_revisions.clear)
+
+
+def bench_create_configfile_cached(size, fake_url):
+    from openeoct.flask.webopeneoct.service import create_configfile
+
+    be_id = environment.add_backends(1, fake_url, endpoints=size)[0]
+    create_configfile(be_id)
+
+    return measure(lambda: create_configfile(be_id))
+
+
+def bench_configs_to_backend(size, fake_url):
+    import toml
+    from openeoct.flask.webopeneoct import db
+    from openeoct.flask.webopeneoct.models import Backend
+    from openeoct.flask.webopeneoct.service import configs_to_backend
+
+    config = {
+        "url": fake_url, "openapi": "openapi.json", "backendversion": "1.0.0",
+        "variables": {"var_{}".format(i): str(i) for i in range(10)},
+        "endpoints": {"endpoint_{}".format(i): {"url": "/collections/c{}".format(i), "request_type": "GET"}
+                      for i in range(size)}
+    }
+    config_path = os.path.abspath("bench_config.toml")
+    with open(config_path, "w") as config_file:
+        toml.dump(config, config_file)
+
+    def setup():
+        for backend in Backend.query.filter(Backend.name == "imported").all():
+            backend.delete()
+        db.session.commit()
+
+    return measure(lambda: configs_to_backend([config_path], "imported"), setup)
+
+
+def bench_read_result(size, fake_url):
+    from openeoct.flask.webopeneoct.service import read_result, WORKING_DIR
+
+    be_id = environment.add_backends(1, fake_url)[0]
+    with open(os.path.join(WORKING_DIR, "result_0.json"), "w") as result_file:
+        json.dump(environment.gen_result(size), result_file, indent=4)
+
+    return measure(lambda: read_result(be_id))
+
+
+def bench_json2html(size, fake_url):
+    from openeoct import json2html
+
+    input_path = os.path.abspath("bench_result.json")
+    output_path = os.path.abspath("bench_result.html")
+    with open(input_path, "w") as result_file:
+        json.dump(environment.gen_result(size), result_file, indent=4)
+
+    return measure(lambda: json2html.main(input_path, output_path))
+
+
+def bench_view_home(size, fake_url):
+    from openeoct.flask.webopeneoct import app
+
+    environment.add_backends(size, fake_url, endpoints=1)
+    client = app.test_client()
+
+    return measure(lambda: client.get("/"))
+
+
+def bench_view_backend_edit(size, fake_url):
+    from openeoct.flask.webopeneoct import app
+
+    be_id = environment.add_backends(1, fake_url, endpoints=size)[0]
+    client = app.test_client()
+
+    return measure(lambda: client.get("/backend/edit/{}".format(be_id)))
+
+
+def bench_view_endpoint_list(size, fake_url):
+    from openeoct.flask.webopeneoct import app
+
+    environment.add_backends(10, fake_url, endpoints=max(1, size // 10))
+    client = app.test_client()
+
+    return measure(lambda: client.get("/endpoint/list"))
+
+
+BENCHMARKS = {
+    "gen_endpoints": bench_gen_endpoints,
+    "gen_endpoints_unchanged": bench_gen_endpoints_unchanged,
+    "create_configfile": bench_create_configfile,
+    "create_configfile_cached": bench_create_configfile_cached,
+    "configs_to_backend": bench_configs_to_backend,
+    "read_result": bench_read_result,
+    "json2html": bench_json2html,
+    "view_home": bench_view_home,
+    "view_backend_edit": bench_view_backend_edit,
+    "view_endpoint_list": bench_view_endpoint_list,
+}
+
+
+def run(names, sizes, latency=0.0):
+    """
+    Runs the benchmarks at all sizes, each with a fresh database and a fake backend with size endpoints.
+
+    Return
+    ----------
+    results : dict
+        "<benchmark>[<size>]" -> {"min": seconds, "median": seconds}
+    """
+    from fakebackend import FakeBackend
+
+    results = {}
+    for name in names:
+        for size in sizes:
+            environment.reset_database()
+            with FakeBackend(endpoints=size, latency=latency) as fake:
+                durations = BENCHMARKS[name](size, fake.url)
+            key = "{}[{}]".format(name, size)
+            results[key] = {"min": min(durations), "median": statistics.median(durations)}
+            print("{:<40} {:>10.2f} ms {:>10.2f} ms".format(key, results[key]["min"] * 1000,
+                                                            results[key]["median"] * 1000))
+            sys.stdout.flush()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns the benchmarks whose median grew by more than tolerance (a fraction) compared to the baseline.
+    """
+    regressions = []
+    for key, result in results.items():
+        if key in baseline and result["median"] > baseline[key]["median"] * (1 + tolerance):
+            regressions.append((key, baseline[key]["median"], result["median"]))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("benchmarks", nargs="*", metavar="BENCHMARK",
+                        help="benchmarks to run, all if none given: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="numbers of backends/endpoints")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the fake backend waits per response")
+    parser.add_argument("--workdir", help="working directory, a temporary directory if not given")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare the results to this JSON file of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed growth of the median compared to the baseline (default 0.25)")
+    args = parser.parse_args()
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error("unknown benchmarks: " + ", ".join(unknown))
+
+    # the paths are resolved before prepare changes the working directory
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    workdir = environment.prepare(args.workdir)
+    print("Working directory: {}".format(workdir))
+    print("{:<40} {:>13} {:>13}".format("benchmark", "min", "median"))
+    results = run(args.benchmarks or list(BENCHMARKS), args.sizes, latency=args.latency)
+
+    if output:
+        with open(output, "w") as output_file:
+            json.dump(results, output_file, indent=4, sort_keys=True)
+
+    if baseline_path:
+        with open(baseline_path) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for key, before, after in regressions:
+            print("REGRESSION {}: {:.2f} ms -> {:.2f} ms".format(key, before * 1000, after * 1000))
+        if regressions:
+            sys.exit(1)
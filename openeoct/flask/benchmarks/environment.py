@@ -0,0 +1,100 @@
+"""
+Scratch environment of the benchmarks: a temporary working directory laid out like the repository and a scratch
+database, so that neither the config files nor the database of a real instance are touched.
+"""
+import os
+import sys
+import tempfile
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+
+def prepare(workdir=None):
+    """
+    Creates the working directory and points the web application to a database in it. Has to be called before
+    the web application is imported.
+
+    Parameters
+    ----------
+    workdir : str
+        Working directory, a temporary directory if None
+
+    Return
+    ----------
+    workdir : str
+        The working directory, the web application runs in workdir/flask/webopeneoct, so that WORKING_DIR
+        ("../..", where the openeoct binary and the result files are) is workdir.
+    """
+    workdir = os.path.abspath(workdir or tempfile.mkdtemp(prefix="openeoct-bench-"))
+    app_dir = os.path.join(workdir, "flask", "webopeneoct")
+    os.makedirs(app_dir, exist_ok=True)
+
+    os.environ["OPENEOCT_DATABASE_URI"] = "sqlite:///" + os.path.join(workdir, "openeoct.sqlite")
+    # the background health probes would add requests to the fake backend during the measurements
+    os.environ.setdefault("OPENEOCT_HEALTH_PROBE", "0")
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    os.chdir(app_dir)
+    return workdir
+
+
+def reset_database():
+    """
+    Drops and recreates all tables of the scratch database.
+    """
+    from openeoct.flask.webopeneoct import db
+    from openeoct.flask.webopeneoct.cache import well_known_cache, backend_choices_cache
+    from openeoct.flask.webopeneoct.service import config_revisions
+
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    well_known_cache.clear()
+    backend_choices_cache.clear()
+    config_revisions.clear()
+
+
+def add_backends(count, url, endpoints=0, version="1.0.0"):
+    """
+    Adds backends with the given number of endpoints each.
+
+    Return
+    ----------
+    be_ids : list
+        IDs of the added backends.
+    """
+    from openeoct.flask.webopeneoct import db
+    from openeoct.flask.webopeneoct.models import Backend, Endpoint
+
+    backends = [Backend(None, name="backend_{}".format(i), url=url, openapi="openapi.json", version=version,
+                        output="result_{}.json".format(i)) for i in range(count)]
+    db.session.add_all(backends)
+    db.session.flush()
+    rows = []
+    for backend in backends:
+        for i in range(endpoints):
+            rows.append(Endpoint(backend=backend.id, url="/collections/c{}".format(i), type="GET",
+                                 id="endpoint_{}".format(i)))
+    db.session.add_all(rows)
+    db.session.commit()
+    return [backend.id for backend in backends]
+
+
+def gen_result(endpoints, groups=10):
+    """
+    Returns a validation result in the format of the openeoct tool with the given number of endpoints.
+    """
+    result = {}
+    for i in range(endpoints):
+        group = result.setdefault("group_{}".format(i % groups), {"group_summary": "Valid", "endpoints": {}})
+        group["endpoints"]["endpoint_{}".format(i)] = {
+            "url": "/collections/c{}".format(i), "type": "GET", "state": "Valid" if i % 7 else "Invalid",
+            "message": "" if i % 7 else "Response of the back end not valid", "duration_ms": str(i % 500),
+            "size": "1024", "retries": "0"
+        }
+    return {
+        "result": result,
+        "stats": {"backend": {"url": "http://localhost", "baseurl": "http://localhost", "version": "1.0.0"},
+                  "execution": {"start": "2020-01-01 10:00:00", "end": "2020-01-01 10:01:00"},
+                  "spec": {"apifile": "openapi.json"}}
+    }
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+"""
+Local stand-in for an openEO backend, serving /.well-known/openeo, a capabilities document with a configurable
+number of endpoints (with an ETag, so that it can be revalidated) and a minimal JSON response for every other
+path, each after a configurable latency.
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+API_VERSION = "1.0.0"
+
+
+def gen_capabilities(url, endpoints):
+    """
+    Returns a capabilities document listing the given number of endpoints, every fifth one also supports
+    POST and DELETE.
+    """
+    ep_list = [{"path": "/", "methods": ["GET"]}]
+    for i in range(endpoints - 1):
+        methods = ["GET", "POST", "DELETE"] if i % 5 == 0 else ["GET"]
+        ep_list.append({"path": "/collections/c{}".format(i), "methods": methods})
+    return {
+        "api_version": API_VERSION,
+        "backend_version": "fake",
+        "title": "Fake backend",
+        "description": "Local stand-in backend",
+        "endpoints": ep_list,
+        "links": [{"href": url, "rel": "self"}]
+    }
+
+
+class FakeBackendHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, without this the delayed ACKs add ~40 ms per keep-alive request
+    disable_nagle_algorithm = True
+
+    def _send_json(self, status, document, headers=None):
+        body = json.dumps(document).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self):
+        backend = self.server.backend
+        backend.count_request()
+        if backend.latency:
+            time.sleep(backend.latency)
+
+        # the request body is read, so that the connection can be kept alive
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if backend.take_failure(path):
+            self._send_json(503, {"code": "ServiceUnavailable", "message": "Temporarily unavailable"})
+        elif path == "/.well-known/openeo":
+            self._send_json(200, {"versions": [{"api_version": API_VERSION, "url": backend.url + "/v1"}]})
+        elif path == "/v1":
+            if self.headers.get("If-None-Match") == backend.etag:
+                self.send_response(304)
+                self.send_header("ETag", backend.etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            else:
+                self._send_json(200, backend.capabilities, headers={"ETag": backend.etag})
+        elif self.command == "POST":
+            self._send_json(201, {}, headers={"OpenEO-Identifier": "fake-id",
+                                              "Location": backend.url + self.path + "/fake-id"})
+        else:
+            self._send_json(200, {})
+
+    do_GET = _handle
+    do_POST = _handle
+    do_PUT = _handle
+    do_PATCH = _handle
+    do_DELETE = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeBackend:
+    """
+    Fake backend served by a thread of the current process.
+
+    Attributes
+    ----------
+    url : str
+        Base URL of the backend, the versioned API is at url + "/v1"
+    requests : int
+        Number of requests served so far
+    failures : dict
+        Number of requests per path that are answered with 503 Service Unavailable before the path is served
+    """
+
+    def __init__(self, endpoints=10, latency=0.0, host="127.0.0.1", port=0, failures=None):
+        self.latency = latency
+        self.failures = dict(failures or {})
+        self.server = ThreadingHTTPServer((host, port), FakeBackendHandler)
+        self.server.daemon_threads = True
+        self.server.backend = self
+        self.url = "http://{}:{}".format(host, self.server.server_port)
+        self.capabilities = gen_capabilities(self.url + "/v1", endpoints)
+        self.etag = '"{}"'.format(hashlib.sha256(json.dumps(self.capabilities).encode("utf-8")).hexdigest()[:16])
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def count_request(self):
+        with self.lock:
+            self.requests += 1
+
+    def take_failure(self, path):
+        """
+        Returns True if the request of the path has to fail, counting down its remaining failures.
+        """
+        with self.lock:
+            if self.failures.get(path, 0) <= 0:
+                return False
+            self.failures[path] -= 1
+            return True
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--endpoints", type=int, default=10, help="number of endpoints in the capabilities")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before every response")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    backend = FakeBackend(endpoints=args.endpoints, latency=args.latency, host=args.host, port=args.port)
+    print("Fake backend at {}".format(backend.url))
+    try:
+        backend.server.serve_forever()
+    except KeyboardInterrupt:
+        backend.server.server_close()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+"""
+Load test of the web application: many simultaneous users browse the backends and start validations, against a
+local fake backend and a stub openeoct binary with a configurable runtime. Reports throughput, latency percentiles
+and error rates per page, plus the duration of the validations from submission until their results are ready.
+
+    ./loadtest.py --users 20 --duration 60 --backends 50 --endpoints 100 --runtime 5
+"""
+import argparse
+import json
+import os
+import random
+import stat
+import sys
+import threading
+import time
+
+import requests
+
+import environment
+
+# weights of the pages a user requests, the validation of a backend is followed until its results are ready
+DEFAULT_MIX = "home=4,edit=3,endpoints=2,validate=1"
+STATUS_POLL_INTERVAL = 0.5
+
+
+def write_stub_openeoct(workdir, runtime):
+    """
+    Writes the openeoct binary used by the web application (WORKING_DIR/openeoct) as a wrapper of stub_openeoct.py.
+    """
+    stub_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub_openeoct.py")
+    binary_path = os.path.join(workdir, "openeoct")
+    with open(binary_path, "w") as binary:
+        binary.write('#!/bin/sh\nexec "{}" "{}" --runtime {} "$@"\n'.format(sys.executable, stub_path, runtime))
+    os.chmod(binary_path, os.stat(binary_path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def start_app():
+    """
+    Serves the web application with the threaded development server in a background thread.
+
+    Return
+    ----------
+    url : str
+        Base URL of the web application.
+    """
+    from werkzeug.serving import make_server, WSGIRequestHandler
+    from openeoct.flask.webopeneoct import app
+
+    class QuietRequestHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return "http://127.0.0.1:{}".format(server.server_port)
+
+
+class Recorder:
+    """
+    Collects the latency and outcome of every request, per page.
+    """
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def record(self, page, latency, error=None):
+        with self.lock:
+            self.samples.setdefault(page, []).append(latency)
+            if error:
+                self.errors.setdefault(page, {})
+                self.errors[page][error] = self.errors[page].get(error, 0) + 1
+
+    def report(self, elapsed):
+        from openeoct.json2html import percentile
+
+        report = {}
+        with self.lock:
+            for page, latencies in sorted(self.samples.items()):
+                values = sorted(latencies)
+                errors = sum(self.errors.get(page, {}).values())
+                report[page] = {
+                    "requests": len(values),
+                    "throughput": len(values) / elapsed,
+                    "error_rate": errors / len(values),
+                    "errors": self.errors.get(page, {}),
+                    "p50": percentile(values, 50),
+                    "p90": percentile(values, 90),
+                    "p99": percentile(values, 99),
+                    "max": values[-1]
+                }
+        return report
+
+
+class User(threading.Thread):
+    """
+    Simulated user, requesting pages of the web application according to the mix until the deadline.
+    """
+
+    def __init__(self, base_url, be_ids, mix, deadline, recorder, validation_timeout):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.be_ids = be_ids
+        self.pages = list(mix.keys())
+        self.weights = list(mix.values())
+        self.deadline = deadline
+        self.recorder = recorder
+        self.validation_timeout = validation_timeout
+        self.session = requests.Session()
+
+    def request(self, page, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            resp = self.session.get(self.base_url + path, timeout=60, **kwargs)
+        except requests.RequestException as exp:
+            self.recorder.record(page, time.perf_counter() - start, error=type(exp).__name__)
+            return None
+        error = "HTTP {}".format(resp.status_code) if resp.status_code >= 400 else None
+        self.recorder.record(page, time.perf_counter() - start, error=error)
+        return resp
+
+    def validate(self, be_id):
+        submitted = time.perf_counter()
+        resp = self.request("validate", "/backend/validate/{}".format(be_id), allow_redirects=False)
+        if resp is None or resp.status_code != 302:
+            return
+        job_id = resp.headers["Location"].rstrip("/").rsplit("/", 1)[-1]
+
+        while time.perf_counter() - submitted < self.validation_timeout:
+            resp = self.request("validation_status", "/validation/job/{}/status".format(job_id))
+            if resp is None or resp.status_code != 200:
+                return
+            state = resp.json().get("state")
+            if state in ("finished", "error"):
+                self.recorder.record("validation_done", time.perf_counter() - submitted,
+                                     error="job error" if state == "error" else None)
+                return
+            time.sleep(STATUS_POLL_INTERVAL)
+        self.recorder.record("validation_done", time.perf_counter() - submitted, error="timeout")
+
+    def run(self):
+        while time.time() < self.deadline:
+            page = random.choices(self.pages, self.weights)[0]
+            be_id = random.choice(self.be_ids)
+            if page == "home":
+                self.request(page, "/")
+            elif page == "edit":
+                self.request(page, "/backend/edit/{}".format(be_id))
+            elif page == "endpoints":
+                self.request(page, "/endpoint/list")
+            elif page == "validate":
+                self.validate(be_id)
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(","):
+        page, weight = item.split("=")
+        if page not in ("home", "edit", "endpoints", "validate"):
+            raise argparse.ArgumentTypeError("unknown page: " + page)
+        mix[page] = float(weight)
+    return mix
+
+
+def print_report(report):
+    print("{:<20} {:>9} {:>9} {:>8} {:>10} {:>10} {:>10} {:>10}".format(
+        "page", "requests", "req/s", "errors", "p50 ms", "p90 ms", "p99 ms", "max ms"))
+    for page, values in report.items():
+        print("{:<20} {:>9} {:>9.1f} {:>7.1f}% {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f}".format(
+            page, values["requests"], values["throughput"], values["error_rate"] * 100, values["p50"] * 1000,
+            values["p90"] * 1000, values["p99"] * 1000, values["max"] * 1000))
+        for error, count in values["errors"].items():
+            print("    {}: {}".format(error, count))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10, help="number of simultaneous users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds the users send requests")
+    parser.add_argument("--backends", type=int, default=20, help="number of backends in the database")
+    parser.add_argument("--endpoints", type=int, default=50, help="number of endpoints per backend")
+    parser.add_argument("--runtime", type=float, default=2.0, help="seconds a validation of the stub openeoct takes")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the fake backend waits per response")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="weights of the pages, default " + DEFAULT_MIX)
+    parser.add_argument("--validation-timeout", type=float, default=300,
+                        help="seconds after which a validation counts as failed")
+    parser.add_argument("--workdir", help="working directory, a temporary directory if not given")
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+
+    workdir = environment.prepare(args.workdir)
+    write_stub_openeoct(workdir, args.runtime)
+    environment.reset_database()
+
+    from fakebackend import FakeBackend
+    from openeoct.flask.webopeneoct import app
+
+    with FakeBackend(endpoints=args.endpoints, latency=args.latency) as fake:
+        be_ids = environment.add_backends(args.backends, fake.url, endpoints=args.endpoints)
+        base_url = start_app()
+        print("Working directory: {}, web application at {}, {} users for {} s, {} validation workers".format(
+            workdir, base_url, args.users, args.duration, app.config['VALIDATION_WORKERS']))
+
+        recorder = Recorder()
+        start = time.time()
+        users = [User(base_url, be_ids, args.mix, start + args.duration, recorder, args.validation_timeout)
+                 for _ in range(args.users)]
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+        elapsed = time.time() - start
+
+    report = recorder.report(elapsed)
+    print_report(report)
+
+    if output:
+        with open(output, "w") as output_file:
+            json.dump(report, output_file, indent=4)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""
+Stand-in for the openeoct binary: reads the config files like "openeoct config", waits a configurable runtime
+instead of validating and reports every endpoint as valid, supporting the --stdout and --stream flags.
+"""
+import argparse
+import json
+import time
+
+import toml
+
+
+def main(config_paths, runtime, stdout=False, stream=False):
+    start = time.strftime("%Y-%m-%d %H:%M:%S")
+    config = {}
+    endpoints = {}
+    for config_path in config_paths:
+        config_file = toml.load(config_path)
+        endpoints.update(config_file.pop("endpoints", {}))
+        config.update(config_file)
+
+    result = {}
+    for ep_id, endpoint in endpoints.items():
+        group = endpoint.get("group", "nogroup")
+        state = {"url": endpoint.get("url", ""), "type": endpoint.get("request_type", "GET"), "state": "Valid",
+                 "message": "", "duration_ms": str(int(runtime * 1000 / max(1, len(endpoints)))), "size": "2",
+                 "retries": "0"}
+        result.setdefault(group, {"group_summary": "Valid", "endpoints": {}})["endpoints"][ep_id] = state
+        if stream:
+            time.sleep(runtime / max(1, len(endpoints)))
+            print(json.dumps(dict(state, event="endpoint", group=group, id=ep_id)), flush=True)
+    if not stream or not endpoints:
+        time.sleep(runtime)
+
+    stats = {
+        "backend": {"url": config.get("url", ""), "baseurl": config.get("url", ""),
+                    "version": config.get("backendversion", "")},
+        "execution": {"start": start, "end": time.strftime("%Y-%m-%d %H:%M:%S")},
+        "spec": {"apifile": config.get("openapi", "")}
+    }
+    if stream:
+        print(json.dumps({"event": "result", "result": result, "stats": stats}), flush=True)
+    elif stdout:
+        print(json.dumps({"result": result, "stats": stats}, indent=4))
+    if stream or not stdout:
+        with open(config.get("output", "result.json"), "w") as output_file:
+            json.dump({"result": result, "stats": stats}, output_file, indent=4)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runtime", type=float, default=1.0, help="seconds a validation takes")
+    parser.add_argument("--stdout", action="store_true")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("command", choices=["config"])
+    parser.add_argument("config_paths", nargs="+")
+    args = parser.parse_args()
+
+    main(args.config_paths, args.runtime, stdout=args.stdout, stream=args.stream)
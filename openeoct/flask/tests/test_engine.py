@@ -0,0 +1,67 @@
+"""
+Tests of the in-process validation engine against the local fake backend of the benchmarks.
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+
+import environment  # noqa: E402
+from fakebackend import FakeBackend  # noqa: E402
+
+WORKDIR = environment.prepare(tempfile.mkdtemp(prefix="openeoct-test-"))
+
+from openeoct.flask.webopeneoct.engine import ComplianceTest, jsonschema  # noqa: E402
+
+SPEC = {
+    "openapi": "3.0.2",
+    "info": {"title": "Test", "version": "1.0.0"},
+    "paths": {
+        "/collections/{collection_id}": {
+            "get": {
+                "responses": {
+                    "200": {"description": "Collection",
+                            "content": {"application/json": {"schema": {"type": "object"}}}}
+                }
+            }
+        }
+    }
+}
+
+
+@unittest.skipIf(jsonschema is None, "the validation engine requires jsonschema")
+class EngineRetryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.apifile = os.path.join(WORKDIR, "openapi.json")
+        with open(self.apifile, "w") as spec_file:
+            json.dump(SPEC, spec_file)
+
+    def validate(self, backend, retrycode=None):
+        endpoint = {"url": "/collections/c0", "request_type": "GET", "group": "g"}
+        if retrycode:
+            endpoint["retrycode"] = retrycode
+        config = {"url": backend.url + "/v1", "openapi": self.apifile, "endpoints": {"endpoints.ep": endpoint}}
+        return ComplianceTest(config).run()["result"]["g"]["endpoints"]["ep"]
+
+    def test_unavailable_once_is_an_error(self):
+        # like the openeoct tool, the engine does not retry a 503 that does not contain the retry code
+        with FakeBackend(failures={"/v1/collections/c0": 1}) as backend:
+            state = self.validate(backend)
+            self.assertEqual(backend.requests, 2)  # the capabilities and the endpoint, no hidden retry
+        self.assertEqual(state["state"], "Error")
+        self.assertIn("Error: Response Code 503", state["message"])
+        self.assertEqual(state["retries"], "0")
+
+    def test_unavailable_once_with_retry_code(self):
+        with FakeBackend(failures={"/v1/collections/c0": 1}) as backend:
+            state = self.validate(backend, retrycode="ServiceUnavailable")
+        self.assertEqual(state["state"], "Valid")
+        self.assertEqual(state["retries"], "1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,15 +8,51 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 app = Flask(__name__)
 app.secret_key = 'super secret key'
 app.config['SESSION_TYPE'] = 'filesystem'
-app.config["SQLALCHEMY_DATABASE_URI"] = 'sqlite:///' + os.path.join(basedir, 'openeoct.sqlite')
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("OPENEOCT_DATABASE_URI",
+                                                   'sqlite:///' + os.path.join(basedir, 'openeoct.sqlite'))
 app.config['SQLALCHEMY_COMMIT_ON_TEARDOWN'] = True
 app.config['UPLOAD_FOLDER'] = '/tmp'
 app.config['MAX_CONTENT_LENGTH'] = 1 * 1024 * 1024  # 1 MB maximum upload file size
 app.config['BODY_PATH'] = "body"
+app.config['BODY_CACHE_ENTRIES'] = 512  # maximum number of request bodies kept in memory
+app.config['BODY_CACHE_SIZE'] = 32 * 1024 * 1024  # maximum number of characters of the request bodies kept in memory
+app.config['SPEC_PATH'] = "specs"  # local mirrors of the remote OpenAPI specifications
+app.config['SPEC_REVALIDATE'] = 3600  # seconds a mirrored specification is used before checking it for changes
 app.config['D28_Folder'] = "/data/REPO/fork/openeo-D28"
+app.config['VALIDATION_WORKERS'] = 4  # maximum number of openeoct validations running at the same time
+app.config['VALIDATION_JOB_HISTORY'] = 100  # number of finished validation jobs kept in memory
+app.config['VALIDATION_HOST_LIMIT'] = 2  # maximum number of validations running against the host of a versioned url
+app.config['RESULT_FROM_FILE'] = False  # read the results from the output file instead of the openeoct stdout
+app.config['STREAM_RESULTS'] = True  # show the endpoint results of running validations as soon as they are validated
+app.config['STORE_RESULTS'] = True  # store the results of every validation run in the database
+app.config['VALIDATION_ENGINE'] = "openeoct"  # "openeoct" binary, or "python" to validate in-process (requires jsonschema)
+app.config['RUN_LIST_LIMIT'] = 100  # maximum number of validation runs listed per backend
+app.config['PAGE_SIZE'] = 50  # default number of rows per page of the backend and endpoint lists
+app.config['PAGE_SIZE_MAX'] = 500  # maximum number of rows per page that can be requested
+app.config['HTTP_TIMEOUT'] = 10  # seconds until requests to the backends time out
+app.config['HTTP_CONNECT_TIMEOUT'] = 5  # seconds until connecting to a backend times out
+app.config['HTTP_RETRIES'] = 2  # retries of failed requests to the backends
+app.config['HTTP_BACKOFF'] = 0.5  # backoff factor between the retries
+app.config['HTTP_HOST_LIMIT'] = 4  # maximum number of concurrent requests to the same host
+app.config['HTTP_POOL_SIZE'] = 10  # connections kept alive per host
+app.config['WELL_KNOWN_TTL'] = 300  # seconds the /.well-known/openeo documents of the backends are cached
+app.config['WELL_KNOWN_NEGATIVE_TTL'] = 30  # seconds a failed /.well-known/openeo request is cached
+app.config['BACKEND_CHOICES_TTL'] = 300  # seconds the backend choices of the forms are cached, e.g. for CLI changes
+app.config['CAPABILITIES_HISTORY'] = 10  # number of capabilities snapshots kept per backend
+app.config['HEALTH_PROBE'] = os.environ.get("OPENEOCT_HEALTH_PROBE", "1") != "0"  # probe the backends in the background
+app.config['HEALTH_INTERVAL'] = 60  # seconds between two health probes of all backends
+app.config['HEALTH_TIMEOUT'] = 3  # seconds until a health probe request times out
+app.config['HEALTH_CONCURRENCY'] = 20  # maximum number of concurrent health probe requests
+app.config['PROFILE_REQUESTS'] = False  # profile every request and keep the profiles of the slow ones
+app.config['PROFILE_TOKEN'] = None  # if set, requests with "?profile=<token>" are profiled and kept, required for /profiles
+app.config['PROFILE_THRESHOLD'] = 0.5  # seconds a profiled request has to take to be kept
+app.config['PROFILE_HISTORY'] = 50  # number of request profiles kept in memory
+app.config['PROFILE_TOP_FRAMES'] = 30  # number of frames (by cumulative time) kept per profile
 db = SQLAlchemy(app)
 
-from openeoct.flask.webopeneoct import views, models
+from openeoct.flask.webopeneoct import views, models, commands
 
 # needs to be executed in the first time, to create the sqlite database
 db.create_all()
+# adds the columns and indexes of newer versions to an existing database
+models.upgrade_schema()
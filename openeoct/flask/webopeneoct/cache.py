@@ -0,0 +1,132 @@
+import requests
+import threading
+import time
+from collections import OrderedDict
+from ..webopeneoct import app
+from .httpclient import http_client
+
+
+class TTLCache:
+    """
+    Thread safe dictionary, whose entries expire after a given number of seconds.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns a tuple (hit, value), hit is False if there is no entry for the key or it is expired.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if not entry:
+                return False, None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return False, None
+            return True, value
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+
+    def invalidate(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class LRUCache:
+    """
+    Thread safe dictionary, which keeps the most recently used entries, at most max_entries entries whose values
+    have at most max_size characters (or bytes) in total.
+    """
+
+    def __init__(self, max_entries, max_size):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns a tuple (hit, value), hit is False if there is no entry for the key.
+        """
+        with self.lock:
+            if key not in self.entries:
+                return False, None
+            self.entries.move_to_end(key)
+            return True, self.entries[key]
+
+    def set(self, key, value):
+        if len(value) > self.max_size:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key))
+            self.entries[key] = value
+            self.size += len(value)
+            while len(self.entries) > self.max_entries or self.size > self.max_size:
+                self.size -= len(self.entries.popitem(last=False)[1])
+
+    def invalidate(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+well_known_cache = TTLCache(app.config['WELL_KNOWN_TTL'])
+# (id, name) pairs of all backends for the select fields of the forms, invalidated on commits that add, rename or
+# delete a backend (see models.track_backend_changes)
+backend_choices_cache = TTLCache(app.config['BACKEND_CHOICES_TTL'])
+# content addressed request bodies of the endpoints, by name (see service.BodyHandler)
+body_cache = LRUCache(app.config['BODY_CACHE_ENTRIES'], app.config['BODY_CACHE_SIZE'])
+
+
+def get_well_known(base_url):
+    """
+    Returns the /.well-known/openeo document of a backend. Documents are cached for WELL_KNOWN_TTL seconds,
+    failed requests for WELL_KNOWN_NEGATIVE_TTL seconds.
+
+    Parameters
+    ----------
+    base_url : str
+        URL of the backend without version
+
+    Return
+    ----------
+    well_known : dict
+        The well-known document, None if it could not be retrieved.
+    """
+    hit, well_known = well_known_cache.get(base_url)
+    if hit:
+        return well_known
+
+    try:
+        resp = http_client.get(base_url + "/.well-known/openeo")
+        well_known = resp.json()
+    except (requests.RequestException, ValueError):
+        well_known_cache.set(base_url, None, ttl=app.config['WELL_KNOWN_NEGATIVE_TTL'])
+        return None
+
+    well_known_cache.set(base_url, well_known)
+    return well_known
+
+
+def invalidate_well_known(base_url):
+    well_known_cache.invalidate(base_url)
@@ -0,0 +1,97 @@
+from openeoct.flask.webopeneoct import app
+import click
+import json
+from flask.cli import ScriptInfo
+from .jobs import ValidationQueue, validate_all, validation_queue
+from .service import write_file, iter_result_rows, BodyHandler
+from .health import health_prober
+from .models import Backend
+from .specs import spec_registry, is_remote
+from openeoct.export_results import open_writer, write_rows
+
+
+@app.cli.command("validate-all")
+@click.option("--workers", type=int, default=None,
+              help="Maximum number of concurrent openeoct processes (defaults to VALIDATION_WORKERS).")
+@click.option("--host-limit", type=int, default=None,
+              help="Maximum number of concurrent validations per host (defaults to VALIDATION_HOST_LIMIT).")
+@click.option("--output", default="result_all.json", help="File the aggregated results are written to.")
+@click.argument("be_ids", nargs=-1, type=int)
+def validate_all_command(workers, host_limit, output, be_ids):
+    """
+    Validates all backends (or the given backend ids) in parallel and writes the aggregated results.
+    """
+    queue = validation_queue
+    if workers or host_limit:
+        queue = ValidationQueue(workers or app.config['VALIDATION_WORKERS'],
+                                host_limit=host_limit or app.config['VALIDATION_HOST_LIMIT'])
+
+    batch = validate_all(queue, be_ids=list(be_ids))
+    batch.wait()
+
+    write_file(output, json.dumps(batch.aggregate(), indent=4))
+
+    for name, job in batch.jobs.items():
+        click.echo("{}: {}".format(name, job.state))
+    click.echo("Aggregated results written to {}".format(output))
+
+
+@app.cli.command("export-results")
+@click.option("--format", type=click.Choice(["ndjson", "parquet"]), default=None,
+              help="Output format, defaults to parquet for .parquet files and ndjson otherwise.")
+@click.option("--backend", "be_id", type=int, default=None, help="Only export the runs of this backend.")
+@click.argument("output")
+def export_results_command(format, be_id, output):
+    """
+    Exports the stored validation runs with one row per endpoint result, e.g. into results.ndjson.gz.
+    """
+    writer = open_writer(output, format)
+    try:
+        count = write_rows(writer, iter_result_rows(be_id))
+    finally:
+        writer.close()
+
+    click.echo("{} rows written to {}".format(count, output))
+
+
+@app.cli.command("probe-health")
+def probe_health_command():
+    """
+    Probes all backends concurrently once and prints their health.
+    """
+    results = health_prober.probe()
+    for be_id, result in sorted(results.items()):
+        if result["healthy"]:
+            click.echo("{}: {} in {:.0f} ms".format(be_id, result["capabilities_status"],
+                                                   result["capabilities_latency"] * 1000))
+        else:
+            click.echo("{}: {}".format(be_id, result["error"]))
+    click.echo("{} backends probed in {:.2f} s".format(len(results), health_prober.last_duration))
+
+
+@app.cli.command("mirror-specs")
+def mirror_specs_command():
+    """
+    Downloads or revalidates the mirrors of the remote OpenAPI specifications of all backends.
+    """
+    for backend in Backend.query.order_by(Backend.name):
+        if is_remote(backend.openapi):
+            file_path = spec_registry.local_path(backend.openapi)
+            click.echo("{}: {}".format(backend.name, file_path or "not available"))
+
+
+@app.cli.command("collect-bodies")
+@click.option("--migrate", is_flag=True, help="Convert the bodies with legacy names to content addressed bodies first.")
+def collect_bodies_command(migrate):
+    """
+    Removes the request body files no endpoint references any more.
+    """
+    body_handler = BodyHandler()
+    if migrate:
+        click.echo("{} endpoint bodies migrated".format(body_handler.migrate()))
+    click.echo("{} unreferenced body files removed".format(body_handler.collect_garbage()))
+
+
+if __name__ == "__main__":
+    # e.g. "python -m openeoct.flask.webopeneoct.commands validate-all" from the webopeneoct folder
+    app.cli.main(obj=ScriptInfo(create_app=lambda *args: app))
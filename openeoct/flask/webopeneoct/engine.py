@@ -0,0 +1,700 @@
+"""
+In-process validation engine, used instead of the openeoct binary if VALIDATION_ENGINE is "python".
+
+It validates the endpoints of a config (see Backend.to_json) the same way as the openeoct tool and returns
+the same "result"/"stats" JSON. The OpenAPI specifications are loaded once per process: their schemas are
+converted to JSON schema, the routes indexed and a validator compiled per (path, method, status, media type),
+so that a validation run neither starts a process nor parses the specification again.
+Requires the jsonschema package.
+"""
+import inspect
+import json
+import os
+import posixpath
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+from .cache import get_well_known
+from .httpclient import http_client
+from .models import Backend
+from .specs import spec_registry, read_spec_file
+
+try:
+    import jsonschema
+except ImportError:
+    jsonschema = None
+
+try:
+    from referencing import Registry
+    from referencing.jsonschema import DRAFT4
+except ImportError:
+    Registry = None
+
+# jsonschema >= 4.18 resolves the references with an immutable registry, older versions with a RefResolver
+REGISTRY_SUPPORT = jsonschema is not None and Registry is not None and \
+    "registry" in inspect.signature(jsonschema.Draft4Validator).parameters
+
+# base URI of the specification, the local references ("#/components/...") are made absolute with it, so that
+# every compiled schema resolves them against the whole specification
+SPEC_URI = "urn:openeoct:spec"
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+JSON_MEDIA_TYPE = re.compile(r"^application/(.+\+)?json$")
+CAP_EXCEPTIONS = ("/", "/.well-known/openeo")
+MAX_RETRIES = 10
+RETRY_WAIT = 2
+
+
+def engine_available():
+    """
+    Returns True if the dependencies of the engine are installed.
+    """
+    return jsonschema is not None
+
+
+class EndpointError(Exception):
+    """
+    Failed validation of an endpoint, with the state and the parts of the message of the openeoct tool.
+    """
+
+    def __init__(self, state, input, msg, output=""):
+        super().__init__(msg)
+        self.state = state
+        self.input = input
+        self.msg = msg
+        self.output = output
+
+    def message(self):
+        output = self.output.replace("\n", "").replace("\"", "'")
+        output = re.sub(r"\s+", " ", output)
+        return "Input: {}; Error: {}; Details: {}".format(self.input, self.msg, output)
+
+
+class AuthenticationError(Exception):
+    """
+    The credentials of the backend are configured, but no access token could be obtained with them.
+    """
+
+
+def convert_schema(node):
+    """
+    Returns a copy of an OpenAPI 3.0 document, whose schemas are valid JSON schemas (draft 4): "nullable" is
+    replaced by the null type and the local references are made absolute (see SPEC_URI).
+    """
+    if isinstance(node, list):
+        return [convert_schema(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+
+    node = {key: convert_schema(value) for key, value in node.items()}
+    ref = node.get("$ref")
+    if isinstance(ref, str):
+        if ref.startswith("#"):
+            node["$ref"] = SPEC_URI + ref
+        return node
+
+    if node.get("nullable") is True:
+        del node["nullable"]
+        if "enum" in node and None not in node["enum"]:
+            node["enum"] = node["enum"] + [None]
+        if isinstance(node.get("type"), str):
+            node["type"] = [node["type"], "null"]
+        elif "type" not in node:
+            node = {"anyOf": [node, {"type": "null"}]}
+    return node
+
+
+def path_regex(path):
+    """
+    Returns the regular expression matching the URLs of a path of the specification, e.g. "/jobs/{job_id}".
+    """
+    parts = re.split(r"{[^{}/]*}", path)
+    return re.compile("^" + "[^/]+".join(re.escape(part) for part in parts) + "$")
+
+
+def build_url(base, endpoint_url):
+    """
+    Appends the URL of an endpoint to the URL of a backend, like the openeoct tool.
+    """
+    parts = urlparse(base)
+    path = posixpath.normpath(posixpath.join(parts.path or "/", endpoint_url.lstrip("/")))
+    if path.startswith("//"):
+        path = path[1:]
+    return parts._replace(path=path).geturl()
+
+
+def media_type(content_type):
+    return (content_type or "").split(";", 1)[0].strip().lower()
+
+
+class CompiledSpec:
+    """
+    OpenAPI specification prepared for the validation: the routes ordered so that paths without parameters are
+    matched first, and a compiled validator per request body and per response.
+
+    Attributes
+    ----------
+    spec : dict
+        The specification, converted by convert_schema
+    routes : list
+        (regex, path, operations) per path, operations maps the upper case methods to the operations
+    request_validators : dict
+        (path, method, media type) -> validator of the request body
+    response_validators : dict
+        (path, method, status, media type) -> validator of the response body, the status as in the
+        specification ("200", "4XX", "default")
+    """
+
+    def __init__(self, spec):
+        self.spec = convert_schema(spec)
+        if REGISTRY_SUPPORT:
+            self.registry = Registry().with_resource(SPEC_URI, DRAFT4.create_resource(self.spec))
+        self.local = threading.local()
+
+        self.routes = []
+        self.request_validators = {}
+        self.response_validators = {}
+        for path, path_item in self.spec.get("paths", {}).items():
+            path_item = self.resolve(path_item)
+            operations = {method.upper(): operation for method, operation in path_item.items()
+                          if method in HTTP_METHODS}
+            for method, operation in operations.items():
+                self.compile_operation(path, method, operation)
+            self.routes.append((path_regex(path), path, operations))
+        self.routes.sort(key=lambda route: route[1].count("{"))
+
+    def resolve(self, node):
+        """
+        Follows the references of a node of the specification, e.g. of a response or request body.
+        """
+        while isinstance(node, dict) and isinstance(node.get("$ref"), str):
+            target = self.spec
+            for part in node["$ref"].split("#", 1)[-1].strip("/").split("/"):
+                if part:
+                    target = target[part.replace("~1", "/").replace("~0", "~")]
+            node = target
+        return node
+
+    def compile_schema(self, schema):
+        if REGISTRY_SUPPORT:
+            return jsonschema.Draft4Validator(schema, registry=self.registry)
+        return jsonschema.Draft4Validator(schema)
+
+    def first_error(self, validator, document):
+        """
+        Returns the most relevant error of the document, None if it is valid.
+        """
+        if not REGISTRY_SUPPORT:
+            # a RefResolver keeps state while resolving, so every thread uses its own
+            resolver = getattr(self.local, "resolver", None)
+            if resolver is None:
+                resolver = self.local.resolver = jsonschema.RefResolver(SPEC_URI, self.spec)
+            validator = type(validator)(validator.schema, resolver=resolver)
+        return jsonschema.exceptions.best_match(validator.iter_errors(document))
+
+    def compile_operation(self, path, method, operation):
+        request_body = self.resolve(operation.get("requestBody")) or {}
+        for media, content in request_body.get("content", {}).items():
+            if "schema" in content:
+                self.request_validators[(path, method, media)] = self.compile_schema(content["schema"])
+
+        for status, response in operation.get("responses", {}).items():
+            for media, content in (self.resolve(response).get("content") or {}).items():
+                if "schema" in content:
+                    self.response_validators[(path, method, str(status), media)] = \
+                        self.compile_schema(content["schema"])
+
+    def find_route(self, method, url):
+        """
+        Returns the path and operation of the specification matching the endpoint URL and method.
+
+        Raises
+        ----------
+        EndpointError
+            If there is no such path or the path does not support the method.
+        """
+        url_path = urlparse(url).path or "/"
+        for regex, path, operations in self.routes:
+            if regex.match(url_path):
+                if method not in operations:
+                    raise EndpointError("Invalid", "{}  {}".format(method, url),
+                                        "Error finding endpoint in the OpenAPI definition",
+                                        "Path doesn't support the HTTP method")
+                return path, operations[method]
+        raise EndpointError("Invalid", "{}  {}".format(method, url), "Error finding endpoint in the OpenAPI definition",
+                            "Path was not found")
+
+    def request_content_type(self, operation):
+        """
+        Returns the content type of the request body of an operation, None if it has none.
+        """
+        request_body = self.resolve(operation.get("requestBody")) or {}
+        return next(iter(request_body.get("content", {})), None)
+
+    def validate_request(self, url, path, method, operation, body, content_type):
+        request_body = self.resolve(operation.get("requestBody")) or {}
+        if not body:
+            if request_body.get("required"):
+                raise EndpointError("Invalid", "{}  {}".format(method, url), "Error validating the request",
+                                    "request body has an error: value is required but missing")
+            return
+
+        validator = self.request_validators.get((path, method, media_type(content_type)))
+        if validator is None or not JSON_MEDIA_TYPE.match(media_type(content_type)):
+            return
+        try:
+            document = json.loads(body)
+        except ValueError as exp:
+            raise EndpointError("Invalid", "{}  {}".format(method, url), "Error validating the request",
+                                "request body has an error: " + str(exp))
+        error = self.first_error(validator, document)
+        if error is not None:
+            raise EndpointError("Invalid", "{}  {}".format(method, url), "Error validating the request",
+                                "request body has an error: " + describe_error(error))
+
+    def validate_response(self, path, method, operation, status, content_type, body):
+        responses = operation.get("responses", {})
+        for key in (str(status), "{}XX".format(status // 100), "default"):
+            if key in responses:
+                break
+        else:
+            return
+
+        content = self.resolve(responses[key]).get("content")
+        if not content:
+            return
+        media = media_type(content_type)
+        for candidate in (media, media.split("/", 1)[0] + "/*", "*/*"):
+            if candidate in content:
+                break
+        else:
+            raise EndpointError("Invalid", "", "Response of the back end not valid",
+                                "response header Content-Type has unexpected value: \"{}\"".format(content_type))
+
+        validator = self.response_validators.get((path, method, key, candidate))
+        if validator is None or not JSON_MEDIA_TYPE.match(media):
+            return
+        if not body:
+            raise EndpointError("Invalid", "", "Response of the back end not valid", "response body is missing")
+        try:
+            document = json.loads(body)
+        except ValueError as exp:
+            raise EndpointError("Invalid", "", "Response of the back end not valid",
+                                "response body is no valid JSON: " + str(exp))
+        error = self.first_error(validator, document)
+        if error is not None:
+            raise EndpointError("Invalid", "", "Response of the back end not valid",
+                                "response body doesn't match the schema: " + describe_error(error))
+
+
+def describe_error(error):
+    location = "/".join(str(part) for part in error.absolute_path)
+    if location:
+        return "{} (at /{})".format(error.message, location)
+    return error.message
+
+
+class SpecCache:
+    """
+    Process wide cache of the compiled specifications, keyed by their location. Local files are compiled again
+    if they were modified, failed loads are not cached.
+    """
+
+    def __init__(self):
+        self.specs = {}
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def get(self, location, base_dir="."):
+        """
+        Returns the compiled specification of a local file (absolute or relative to base_dir) or URL, remote
+        specifications are read from their local mirror (see specs.py).
+
+        Raises
+        ----------
+        EndpointError
+            If the specification can not be loaded.
+        """
+        file_path = spec_registry.local_path(location, base_dir)
+        if not file_path:
+            raise EndpointError("Error", location, "Error reading the openEO API, neighter file nor url found",
+                                "no such file or url: " + location)
+        version = os.path.getmtime(file_path)
+
+        with self.lock:
+            lock = self.locks.setdefault(file_path, threading.Lock())
+        # the same specification is compiled only once, even if several validations start at the same time
+        with lock:
+            entry = self.specs.get(file_path)
+            if entry and entry[0] == version:
+                return entry[1]
+            spec = CompiledSpec(load_spec(file_path))
+            self.specs[file_path] = (version, spec)
+            return spec
+
+    def clear(self):
+        with self.lock:
+            self.specs.clear()
+
+
+def load_spec(file_path):
+    """
+    Reads an OpenAPI specification in JSON or YAML.
+    """
+    try:
+        return read_spec_file(file_path)
+    except (OSError, ValueError, ImportError) as exp:
+        raise EndpointError("Error", file_path, "Error reading the openEO API, neighter file nor url found", str(exp))
+
+
+spec_cache = SpecCache()
+
+
+def config_value(value):
+    """
+    Returns the value of the environment variable if the config value is "$<name>", like the openeoct tool.
+    """
+    if isinstance(value, str) and value.startswith("$"):
+        return os.environ.get(value[1:]) or value
+    return value
+
+
+def load_variable(value, variables):
+    """
+    Replaces the first "{<name>}" in the value by the variable, if it is defined.
+    """
+    if not isinstance(value, str) or "{" not in value or "}" not in value:
+        return value
+    name = value[value.index("{") + 1:value.index("}")]
+    if name in variables:
+        return value.replace("{" + name + "}", str(variables[name]))
+    return value
+
+
+class ComplianceTest:
+    """
+    Validation run of the endpoints of one config, the counterpart of ComplianceTest of the openeoct tool.
+
+    Parameters
+    ----------
+    config : dict
+        Config in the format of the openeoct config files, e.g. Backend.to_json()
+    base_dir : str
+        Directory the relative paths of local specifications are relative to
+    """
+
+    def __init__(self, config, base_dir="."):
+        self.base_dir = base_dir
+        self.baseurl = config_value(config.get("url", ""))
+        self.version = config_value(config.get("backendversion", ""))
+        self.url = self.resolve_url()
+        self.apifile = config_value(config.get("openapi", ""))
+        self.username = config_value(config.get("username", ""))
+        self.password = config_value(config.get("password", ""))
+        self.authurl = config_value(config.get("authurl")) or "/credentials/basic"
+        self.variables = {name: config_value(value) for name, value in config.get("variables", {}).items()}
+
+        self.groups = {}
+        for name, endpoint in config.get("endpoints", {}).items():
+            endpoint = dict(endpoint)
+            # the key is "endpoints.<id>" in the configs of the web application, ids may contain dots themselves
+            if not endpoint.get("id"):
+                endpoint["id"] = name[len("endpoints."):] if name.startswith("endpoints.") else name
+            endpoint.setdefault("group", "nogroup")
+            self.groups.setdefault(endpoint["group"] or "nogroup", []).append(endpoint)
+
+        self.capabilities = self.load_capabilities()
+        self.timing = None
+
+    def resolve_url(self):
+        """
+        Returns the URL of the backend version, looked up in the (cached) well-known document of the backend.
+        """
+        if not self.version:
+            return self.baseurl
+        well_known = get_well_known(self.baseurl)
+        if isinstance(well_known, dict):
+            for version in well_known.get("versions") or []:
+                if version.get("api_version") == self.version:
+                    return version.get("url")
+        return self.baseurl
+
+    def load_capabilities(self):
+        """
+        Returns the (path regex, methods) of the endpoints in the capabilities of the backend.
+        """
+        if not self.url:
+            return []
+        try:
+            capabilities = http_client.get(build_url(self.url, "/"), retry=False).json()
+        except (requests.RequestException, ValueError):
+            return []
+
+        patterns = []
+        for cap_endpoint in (capabilities.get("endpoints") or []) if isinstance(capabilities, dict) else []:
+            try:
+                regex = re.compile("^" + re.sub(r"{[^{}]*}", "[^/]*", cap_endpoint.get("path", "")) + "$")
+            except re.error:
+                continue
+            patterns.append((regex, cap_endpoint.get("methods") or []))
+        return patterns
+
+    def check_capability(self, endpoint):
+        if not self.capabilities:
+            return True
+        return any(regex.match(endpoint["url"]) and endpoint["request_type"] in methods
+                   for regex, methods in self.capabilities)
+
+    def authenticate(self):
+        """
+        Returns the access token of the backend, "" if there are no credentials.
+        Raises an AuthenticationError if the authentication failed, since the endpoints can not be validated then.
+        """
+        if not (self.username and self.password and self.authurl):
+            return ""
+        auth_url = build_url(self.url, self.authurl)
+        try:
+            resp = http_client.get(auth_url, auth=(self.username, self.password), retry=False)
+        except requests.RequestException as exp:
+            raise AuthenticationError("Authentication at {} failed: {}".format(auth_url, exp))
+        if resp.status_code != 200:
+            raise AuthenticationError("Authentication at {} failed: HTTP {}".format(auth_url, resp.status_code))
+        try:
+            token = resp.json().get("access_token")
+        except (ValueError, AttributeError):
+            token = None
+        if not token:
+            raise AuthenticationError("Authentication at {} failed: no access token in the response".format(auth_url))
+        return token
+
+    def load_variables(self, endpoint):
+        endpoint = dict(endpoint)
+        for key in ("body", "group", "id", "request_type", "url"):
+            endpoint[key] = load_variable(endpoint.get(key), self.variables)
+        return endpoint
+
+    def read_body(self, endpoint):
+        """
+        Returns the request body and its content type, the body is read from the file given in the config.
+        """
+        body_path = endpoint.get("body")
+        if not body_path:
+            return None
+        if not os.path.isfile(body_path):
+            raise EndpointError("Error", endpoint["id"], "Body was set in config file, but the file does not exist: "
+                                + body_path, "no such file or directory")
+        try:
+            with open(body_path, "rb") as body_file:
+                return body_file.read()
+        except OSError as exp:
+            raise EndpointError("Error", endpoint["id"], "Error loading body file: " + body_path, str(exp))
+
+    def validate(self, spec, endpoint, token):
+        """
+        Validates one endpoint: the request against the specification, then the response of the backend.
+
+        Return
+        ----------
+        state : str
+            "Valid", or "Retry" if the response contains the retry code of the endpoint
+
+        Raises
+        ----------
+        EndpointError
+            If the endpoint is not valid.
+        """
+        if token and endpoint["url"] == "/credentials/basic":
+            return "Valid"
+        if isinstance(spec, EndpointError):
+            raise spec
+
+        method = endpoint["request_type"] or "GET"
+        headers = {}
+        if token:
+            headers["Authorization"] = "Bearer basic//" + token
+        body = self.read_body(endpoint)
+
+        try:
+            path, operation = spec.find_route(method, endpoint["url"])
+        except EndpointError as exp:
+            if body is not None:
+                raise EndpointError("Error", endpoint["id"], "Error setting correct content-type for url {} and "
+                                    "method {}".format(endpoint["url"], method), exp.output)
+            raise
+        if body is not None and method != "GET" and spec.request_content_type(operation):
+            headers["Content-Type"] = spec.request_content_type(operation)
+        spec.validate_request(endpoint["url"], path, method, operation, body, headers.get("Content-Type"))
+
+        if ".well-known" in endpoint["url"]:
+            # like the openeoct tool, the well-known document is requested without authentication and body
+            url = build_url(self.baseurl, endpoint["url"])
+            headers, body = {}, None
+        else:
+            url = build_url(self.url, endpoint["url"])
+        kwargs = {"timeout": endpoint["timeout"]} if endpoint.get("timeout") else {}
+
+        start = time.monotonic()
+        try:
+            resp = http_client.request(method, url, retry=False, headers=headers, data=body, **kwargs)
+        except requests.RequestException as exp:
+            self.timing = (time.monotonic() - start, 0)
+            raise EndpointError("Invalid", "{}  {}".format(method, endpoint["url"]),
+                                "Error sending request to back end", str(exp))
+        self.timing = (time.monotonic() - start, len(resp.content))
+
+        if resp.status_code == 401:
+            raise EndpointError("Invalid", "Header Auth: " + headers.get("Authorization", ""),
+                                "Error: Basic Authentication failed.", resp.text)
+        if resp.status_code == 404:
+            raise EndpointError("Missing", endpoint["url"], "Response Code 404", resp.text)
+        if 400 <= resp.status_code < 600:
+            error = EndpointError("Error", endpoint["url"], "Response Code {}".format(resp.status_code), resp.text)
+            if endpoint.get("retrycode") and endpoint["retrycode"] in resp.text:
+                error.state = "Retry"
+                return error
+            raise error
+
+        spec.validate_response(path, method, operation, resp.status_code, resp.headers.get("Content-Type"),
+                               resp.content)
+
+        if endpoint["url"] == "/jobs" and method == "POST" and resp.headers.get("OpenEO-Identifier"):
+            self.variables["job_id"] = resp.headers["OpenEO-Identifier"]
+        if endpoint["url"] == "/services" and method == "POST" and resp.headers.get("OpenEO-Identifier"):
+            self.variables["service_id"] = resp.headers["OpenEO-Identifier"]
+        return "Valid"
+
+    def validate_endpoint(self, spec, endpoint, token):
+        """
+        Validates one endpoint, retrying it as long as the response contains its retry code.
+
+        Return
+        ----------
+        state : dict
+            State of the endpoint in the format of the openeoct results.
+        """
+        retries = 0
+        self.timing = None
+        try:
+            state = self.validate(spec, endpoint, token)
+            while isinstance(state, EndpointError) and retries < MAX_RETRIES:
+                retries += 1
+                self.timing = None
+                state = self.validate(spec, endpoint, token)
+                if isinstance(state, EndpointError):
+                    time.sleep(RETRY_WAIT)
+            if isinstance(state, EndpointError):
+                raise state
+            ep_state = {"state": state, "message": ""}
+        except EndpointError as exp:
+            if endpoint.get("optional"):
+                ep_state = {"state": "Valid", "message": "Non-mandatory endpoint, not supported by back-end"}
+            else:
+                ep_state = {"state": exp.state, "message": exp.message()}
+
+        if self.timing:
+            ep_state["duration_ms"] = str(int(self.timing[0] * 1000))
+            ep_state["size"] = str(self.timing[1])
+            ep_state["retries"] = str(retries)
+        return ep_state
+
+    def run(self, on_event=None):
+        """
+        Validates all endpoints, group by group and within a group ordered by their "order".
+
+        Parameters
+        ----------
+        on_event : function
+            If given, called with the state of every endpoint as soon as it is validated, like the lines of the
+            "--stream" flag of the openeoct tool
+
+        Return
+        ----------
+        result : dict
+            Validation results in the format of the openeoct tool.
+        """
+        start = time.strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            spec = spec_cache.get(self.apifile, self.base_dir)
+        except EndpointError as exp:
+            spec = exp
+        token = self.authenticate()
+
+        states = {}
+        for group, endpoints in self.groups.items():
+            endpoints.sort(key=lambda ep: (not ep.get("order"), ep.get("order") or 0))
+            for endpoint in endpoints:
+                if not self.check_capability(endpoint) and endpoint["url"] not in CAP_EXCEPTIONS:
+                    state = {"state": "NotSupported",
+                             "message": "Endpoint skipped, not listed in backend capabilities"}
+                else:
+                    endpoint = self.load_variables(endpoint)
+                    state = self.validate_endpoint(spec, endpoint, token)
+                states[(group, endpoint["id"])] = state
+                if on_event:
+                    on_event(self.event(group, endpoint, state))
+                if endpoint.get("wait"):
+                    time.sleep(endpoint["wait"])
+
+        # the variables are loaded again, to show the URLs with the ids of the created jobs and services
+        result = {}
+        for group, endpoints in self.groups.items():
+            for endpoint in endpoints:
+                endpoint = self.load_variables(endpoint)
+                state = states.get((group, endpoint["id"]), {})
+                group_json = result.setdefault(group, {"group_summary": "", "endpoints": {}})
+                group_json["endpoints"][endpoint["id"]] = dict(state, url=endpoint["url"],
+                                                               type=endpoint["request_type"])
+                if state.get("state") not in ("Valid", "NotSupported"):
+                    group_json["group_summary"] = "Invalid"
+                elif state.get("state") == "Valid" and group_json["group_summary"] != "Invalid":
+                    group_json["group_summary"] = "Valid"
+                elif state.get("state") == "NotSupported" and group_json["group_summary"] == "":
+                    group_json["group_summary"] = "NotSupported"
+
+        return {
+            "result": result,
+            "stats": {
+                "backend": {"url": self.url, "baseurl": self.baseurl, "version": self.version},
+                "execution": {"start": start, "end": time.strftime("%Y-%m-%d %H:%M:%S")},
+                "spec": {"apifile": self.apifile}
+            }
+        }
+
+    def event(self, group, endpoint, state):
+        return {
+            "event": "endpoint",
+            "group": group,
+            "id": endpoint["id"],
+            "url": endpoint["url"],
+            "type": endpoint["request_type"],
+            "state": state.get("state", ""),
+            "message": state.get("message", ""),
+            "duration_ms": state.get("duration_ms", ""),
+            "size": state.get("size", ""),
+            "retries": state.get("retries", "")
+        }
+
+
+def validate_backend(be_id, on_event=None, base_dir="."):
+    """
+    Validates a backend with its config stored in the database.
+
+    Parameters
+    ----------
+    be_id : int
+        ID of backend
+    on_event : function
+        If given, called with the state of every endpoint as soon as it is validated
+    base_dir : str
+        Directory the relative paths of local specifications are relative to
+
+    Return
+    ----------
+    result : dict
+        Validation results in the format of the openeoct tool.
+    """
+    backend = Backend.query.filter(Backend.id == be_id).first()
+    return ComplianceTest(backend.to_json(), base_dir=base_dir).run(on_event)
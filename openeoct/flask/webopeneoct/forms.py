@@ -2,7 +2,7 @@ from wtforms import Form, BooleanField, StringField, PasswordField, validators,
                     TextAreaField, IntegerField, FieldList, FormField
 from wtforms.validators import DataRequired
 from wtforms.widgets import PasswordInput
-from .models import Backend, Endpoint, Variable
+from .models import Backend, Endpoint, Variable, get_backend_choices
 from .service import BodyHandler
 import os
 
@@ -20,17 +20,11 @@ class VariableForm(Form):
 
     def __init__(self, *args, **kwargs):
         """
-            Constructor of the EndpointForm. Creates the backend list according to the entities of the database.
+            Constructor of the EndpointForm. Sets the backend list to the (cached) backends of the database.
 
         """
         super(VariableForm, self).__init__(*args, **kwargs)
-        backends = Backend.query.with_entities(
-            Backend.id, Backend.name). \
-            order_by(Backend.name).all()
-        self.backend.choices = [
-            (backend.id, backend.name)
-            for backend in backends
-        ]
+        self.backend.choices = get_backend_choices()
 
     def set_variable(self, variable):
 
@@ -154,17 +148,11 @@ class EndpointForm(Form):
 
     def __init__(self, *args, **kwargs):
         """
-            Constructor of the EndpointForm. Creates the backend list according to the entities of the database.
+            Constructor of the EndpointForm. Sets the backend list to the (cached) backends of the database.
 
         """
         super(EndpointForm, self).__init__(*args, **kwargs)
-        backends = Backend.query.with_entities(
-            Backend.id, Backend.name). \
-            order_by(Backend.name).all()
-        self.backend.choices = [
-            (backend.id, backend.name)
-            for backend in backends
-        ]
+        self.backend.choices = get_backend_choices()
 
     def set_endpoint(self, endpoint):
         """
@@ -225,11 +213,11 @@ class EndpointForm(Form):
            Return
            ----------
            endpoint : Endpoint
-               Endpoint instance with values of the form.
+               Endpoint instance with values of the form, its body is stored content addressed.
         """
         ep = Endpoint(self.backend.data, self.url.data, self.type.data, optional=self.optional.data,
                  group=self.group.data, timeout=self.timeout.data, order=self.order.data, id=self.id.data,
                  wait=self.wait.data, retry=self.retry.data)
         if self.body.data:
-            ep.body = "body_{}_{}".format(str(self.backend.data), self.id.data)
+            ep.body = BodyHandler().store_body(self.body.data)
         return ep
\ No newline at end of file
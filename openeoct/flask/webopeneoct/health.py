@@ -0,0 +1,219 @@
+"""
+Health probes of the backends. A background thread requests the /.well-known/openeo document and the capabilities
+of all backends every HEALTH_INTERVAL seconds, concurrently in an asyncio event loop with HEALTH_TIMEOUT, and stores
+status and latency in the BackendHealth table, which the home page reads. The requests are sent with aiohttp if it
+is installed, otherwise by a thread pool of the event loop.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from ..webopeneoct import app, db
+from .models import Backend, BackendHealth
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class HealthProber:
+    """
+    Probes all backends concurrently, in a background thread or on demand (probe). The probes bypass the shared
+    http_client, so that they are neither retried nor queued behind the validations of a host.
+
+    Parameters
+    ----------
+    interval : int
+        Seconds between two probes of all backends
+    timeout : float
+        Seconds until a probe request times out
+    concurrency : int
+        Maximum number of concurrent probe requests
+    """
+
+    def __init__(self, interval, timeout, concurrency):
+        self.interval = interval
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.executor = None
+        self.thread = None
+        self.wake = threading.Event()
+        self.lock = threading.Lock()
+        self.last_duration = None
+
+    def start(self):
+        """
+        Starts the background thread, if it is not running yet.
+        """
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self._run, name="health-prober", daemon=True)
+            self.thread.start()
+
+    def refresh(self):
+        """
+        Lets the background thread probe all backends now instead of after the interval.
+        """
+        self.wake.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.probe()
+            except Exception as exp:
+                app.logger.warning("Health probe failed: %s", exp)
+            self.wake.wait(self.interval)
+            self.wake.clear()
+
+    def probe(self):
+        """
+        Probes all backends and stores the results.
+
+        Return
+        ----------
+        results : dict
+            Backend ID -> BackendHealth columns of the probe
+        """
+        with app.app_context():
+            try:
+                backends = [tuple(row) for row in db.session.query(Backend.id, Backend.url, Backend.version)]
+            finally:
+                db.session.remove()
+
+        start = time.perf_counter()
+        results = asyncio.run(self.probe_all(backends))
+        self.last_duration = time.perf_counter() - start
+
+        with app.app_context():
+            try:
+                self.store(results)
+            finally:
+                db.session.remove()
+        return results
+
+    async def probe_all(self, backends):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        if aiohttp:
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            connector = aiohttp.TCPConnector(limit=self.concurrency)
+            async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+                results = await asyncio.gather(*(self.probe_backend(session, semaphore, *backend)
+                                                 for backend in backends))
+        else:
+            if not self.executor:
+                self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="health-probe")
+            results = await asyncio.gather(*(self.probe_backend(None, semaphore, *backend) for backend in backends))
+        return dict(zip([backend[0] for backend in backends], results))
+
+    async def probe_backend(self, session, semaphore, be_id, url, version):
+        """
+        Requests the well-known document of a backend and then its capabilities, at the URL of the configured
+        version if the well-known document lists it (see Backend.get_url).
+        """
+        url = url or ""
+        wk_status, wk_latency, well_known, wk_error = await self.fetch(session, semaphore,
+                                                                       url + "/.well-known/openeo")
+        capabilities_url = url
+        if version and isinstance(well_known, dict):
+            for entry in well_known.get("versions") or []:
+                if isinstance(entry, dict) and entry.get("api_version") == version and entry.get("url"):
+                    capabilities_url = entry["url"]
+                    break
+
+        cap_status, cap_latency, capabilities, cap_error = await self.fetch(session, semaphore, capabilities_url)
+        healthy = cap_status == 200 and isinstance(capabilities, dict)
+        if not cap_error and not healthy:
+            cap_error = "HTTP {}".format(cap_status) if cap_status != 200 else "Capabilities are not a JSON object"
+        return {
+            "healthy": healthy,
+            "well_known_status": wk_status,
+            "well_known_latency": wk_latency,
+            "capabilities_url": capabilities_url,
+            "capabilities_status": cap_status,
+            "capabilities_latency": cap_latency,
+            "error": cap_error or wk_error
+        }
+
+    async def fetch(self, session, semaphore, url):
+        """
+        Requests a JSON document.
+
+        Return
+        ----------
+        status : int
+            HTTP status, None if there was no response
+        latency : float
+            Seconds until the response was read
+        document : dict
+            The JSON document, None if the response is no JSON
+        error : str
+            Reason why there is no response, otherwise None
+        """
+        async with semaphore:
+            start = time.perf_counter()
+            if session is not None:
+                try:
+                    async with session.get(url) as resp:
+                        status = resp.status
+                        try:
+                            document = await resp.json(content_type=None)
+                        except ValueError:
+                            document = None
+                except asyncio.TimeoutError:
+                    return None, time.perf_counter() - start, None, "Timeout after {} s".format(self.timeout)
+                except aiohttp.ClientError as exp:
+                    return None, time.perf_counter() - start, None, str(exp) or type(exp).__name__
+            else:
+                loop = asyncio.get_running_loop()
+                try:
+                    status, document = await loop.run_in_executor(self.executor, self.fetch_sync, url)
+                except requests.Timeout:
+                    return None, time.perf_counter() - start, None, "Timeout after {} s".format(self.timeout)
+                except requests.RequestException as exp:
+                    return None, time.perf_counter() - start, None, str(exp) or type(exp).__name__
+            return status, time.perf_counter() - start, document, None
+
+    def fetch_sync(self, url):
+        resp = requests.get(url, timeout=self.timeout)
+        try:
+            return resp.status_code, resp.json()
+        except ValueError:
+            return resp.status_code, None
+
+    def store(self, results):
+        """
+        Writes the probe results into the BackendHealth table, in one transaction. Results of backends deleted
+        during the probe are dropped.
+        """
+        checked = datetime.now()
+        be_ids = {row.id for row in db.session.query(Backend.id).filter(Backend.id.in_(list(results)))} \
+            if results else set()
+        existing = {health.backend: health for health in
+                    BackendHealth.query.filter(BackendHealth.backend.in_(list(results)))} if results else {}
+        for be_id, result in results.items():
+            if be_id not in be_ids:
+                continue
+            health = existing.get(be_id)
+            if not health:
+                health = BackendHealth(backend=be_id)
+                db.session.add(health)
+            for key, value in result.items():
+                setattr(health, key, value)
+            health.checked = checked
+        db.session.commit()
+
+
+health_prober = HealthProber(app.config['HEALTH_INTERVAL'], app.config['HEALTH_TIMEOUT'],
+                             app.config['HEALTH_CONCURRENCY'])
+
+
+@app.before_first_request
+def start_health_prober():
+    if app.config['HEALTH_PROBE']:
+        health_prober.start()
@@ -0,0 +1,142 @@
+import requests
+import threading
+import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlparse
+from ..webopeneoct import app
+from .metrics import metrics
+from .profiling import record_http
+
+
+class HostStats:
+    """
+    Counters of the requests sent to one host.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+
+    def to_json(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "bytes": self.bytes,
+            "latency_sum": self.latency_sum,
+            "latency_max": self.latency_max,
+            "latency_avg": self.latency_sum / self.requests if self.requests else 0.0
+        }
+
+
+backend_request_duration = metrics.histogram("openeoct_backend_request_duration_seconds",
+                                             "Duration of the requests to the backends, including retries.",
+                                             ("host",))
+backend_request_errors = metrics.counter("openeoct_backend_request_errors_total",
+                                         "Failed requests to the backends.", ("host",))
+backend_request_retries = metrics.counter("openeoct_backend_request_retries_total",
+                                          "Retries of requests to the backends.", ("host",))
+backend_response_bytes = metrics.counter("openeoct_backend_response_bytes_total",
+                                         "Bytes received from the backends.", ("host",))
+
+
+class HttpClient:
+    """
+    Shared client for all requests of the web application to the backends. Keeps a pooled keep-alive session
+    per host, sets connect and read timeouts, retries failed requests with backoff, limits the concurrent
+    requests per host and counts latency, bytes and errors per host. Requests with retry=False are sent by a
+    second session of the host without retries, e.g. those of the validation engine, which retries on its own.
+    """
+
+    def __init__(self, connect_timeout, read_timeout, retries=2, backoff=0.5, host_limit=4, pool_size=10):
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.host_limit = host_limit
+        self.pool_size = pool_size
+        self.sessions = {}
+        self.plain_sessions = {}
+        self.host_locks = {}
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def _session(self, max_retries):
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=max_retries)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _host(self, host, retry=True):
+        """
+        Returns session, concurrency limit and stats of a host, creating them on the first request.
+        """
+        with self.lock:
+            if host not in self.sessions:
+                self.sessions[host] = self._session(Retry(total=self.retries, backoff_factor=self.backoff,
+                                                          status_forcelist=(502, 503, 504), raise_on_status=False))
+                self.host_locks[host] = threading.BoundedSemaphore(self.host_limit)
+                self.stats[host] = HostStats()
+            if retry:
+                return self.sessions[host], self.host_locks[host], self.stats[host]
+            if host not in self.plain_sessions:
+                self.plain_sessions[host] = self._session(0)
+            return self.plain_sessions[host], self.host_locks[host], self.stats[host]
+
+    def request(self, method, url, retry=True, **kwargs):
+        """
+        Sends a request, same parameters as requests.request. The timeout defaults to the one of the client,
+        failed requests are not retried if retry is False.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlparse(url).netloc
+        session, host_lock, stats = self._host(host, retry)
+
+        start = time.monotonic()
+        with host_lock:
+            try:
+                resp = session.request(method, url, **kwargs)
+            except requests.RequestException:
+                self._record(stats, time.monotonic() - start, error=True, host=host)
+                record_http(method, url, None, time.monotonic() - start)
+                raise
+        retries = resp.raw.retries.history if resp.raw is not None and resp.raw.retries else ()
+        self._record(stats, time.monotonic() - start, size=len(resp.content), retries=len(retries),
+                     error=resp.status_code >= 400, host=host)
+        record_http(method, url, resp.status_code, time.monotonic() - start)
+        return resp
+
+    def get(self, url, retry=True, **kwargs):
+        return self.request("GET", url, retry=retry, **kwargs)
+
+    def _record(self, stats, latency, size=0, retries=0, error=False, host=None):
+        backend_request_duration.observe(latency, host)
+        backend_response_bytes.inc(host, amount=size)
+        backend_request_retries.inc(host, amount=retries)
+        if error:
+            backend_request_errors.inc(host)
+        with self.lock:
+            stats.requests += 1
+            stats.bytes += size
+            stats.retries += retries
+            stats.latency_sum += latency
+            stats.latency_max = max(stats.latency_max, latency)
+            if error:
+                stats.errors += 1
+
+    def get_stats(self):
+        """
+        Returns the counters of all hosts as dictionary keyed by host.
+        """
+        with self.lock:
+            return {host: stats.to_json() for host, stats in self.stats.items()}
+
+
+http_client = HttpClient(app.config['HTTP_CONNECT_TIMEOUT'], app.config['HTTP_TIMEOUT'],
+                         retries=app.config['HTTP_RETRIES'], backoff=app.config['HTTP_BACKOFF'],
+                         host_limit=app.config['HTTP_HOST_LIMIT'], pool_size=app.config['HTTP_POOL_SIZE'])
@@ -0,0 +1,353 @@
+from openeoct.flask.webopeneoct import db
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from ..webopeneoct import app
+from .models import Backend
+from .service import run_validation, get_host
+from .metrics import metrics, validations
+
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_FINISHED = "finished"
+JOB_ERROR = "error"
+
+
+def error_message(result):
+    """
+    Returns the message of a failed validation, run_validation returns its errors as a list of messages.
+    """
+    if not result:
+        return "No result"
+    if isinstance(result, (list, tuple)):
+        return "; ".join(str(message) for message in result)
+    return str(result)
+
+
+class ValidationJob:
+    """
+    Validation job of one backend, executed asynchronously by the ValidationQueue.
+
+    Attributes
+    ----------
+    id : str
+        Identifier of the job
+    be_id : int
+        ID of the validated backend
+    state : str
+        One of "queued", "running", "finished" or "error"
+    result : dict
+        Validation result of the openeoct tool, None until the job is finished
+    error : str
+        Error message if the job failed
+    events : list
+        States of the endpoints validated so far, if the results are streamed
+    """
+
+    def __init__(self, be_id, host=None):
+        self.id = uuid.uuid4().hex
+        self.be_id = be_id
+        self.host = host
+        self.state = JOB_QUEUED
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.events = []
+        self.condition = threading.Condition()
+
+    def done(self):
+        return self.state in (JOB_FINISHED, JOB_ERROR)
+
+    def wait(self, timeout=None):
+        """
+        Waits until the job is done, returns False if the timeout expired before.
+        """
+        with self.condition:
+            return self.condition.wait_for(self.done, timeout)
+
+    def add_event(self, event):
+        with self.condition:
+            self.events.append(event)
+            self.condition.notify_all()
+
+    def wait_events(self, index, timeout=None):
+        """
+        Waits until there are events after the given index or the job is done.
+
+        Parameters
+        ----------
+        index : int
+            Number of events already consumed
+        timeout : float
+            Maximum seconds to wait
+
+        Return
+        ----------
+        events : list
+            Events after the given index, empty if there are none yet.
+        """
+        with self.condition:
+            if len(self.events) <= index and not self.done():
+                self.condition.wait(timeout)
+            return self.events[index:]
+
+    def to_json(self):
+        return {
+            "id": self.id,
+            "backend": self.be_id,
+            "state": self.state,
+            "error": self.error,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished
+        }
+
+
+class BatchValidation:
+    """
+    Validation of several backends at once, aggregating the results of its jobs into one run.
+
+    Attributes
+    ----------
+    id : str
+        Identifier of the batch
+    jobs : dict
+        Validation jobs of the batch, keyed by backend name
+    """
+
+    def __init__(self, jobs):
+        self.id = uuid.uuid4().hex
+        self.jobs = jobs
+        self.submitted = time.time()
+
+    def done(self):
+        return all(job.done() for job in self.jobs.values())
+
+    def wait(self, timeout=None):
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for job in self.jobs.values():
+            remaining = max(0, deadline - time.monotonic()) if deadline is not None else None
+            if not job.wait(remaining):
+                return False
+        return True
+
+    def to_json(self):
+        return {
+            "id": self.id,
+            "submitted": self.submitted,
+            "jobs": {name: job.to_json() for name, job in self.jobs.items()}
+        }
+
+    def aggregate(self):
+        """
+        Collects the results of all jobs into one dictionary.
+
+        Return
+        ----------
+        result : dict
+            Results keyed by backend name, plus the timing of the whole run in "stats".
+        """
+        started = [job.started for job in self.jobs.values() if job.started]
+        finished = [job.finished for job in self.jobs.values() if job.finished]
+        result = {
+            "backends": {},
+            "stats": {
+                "start": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(min(started))) if started else None,
+                "end": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(max(finished))) if finished else None
+            }
+        }
+        for name, job in self.jobs.items():
+            if job.result:
+                result["backends"][name] = job.result
+            else:
+                result["backends"][name] = {"error": job.error, "state": job.state}
+        return result
+
+
+class ValidationQueue:
+    """
+    Bounded pool of worker threads running the validations, so that the requests submitting them
+    return immediately. Every worker drives one openeoct process, so max_workers limits the
+    concurrent openeoct processes and host_limit the concurrent validations against the same host.
+    Jobs of a host that is at its limit wait in a pending queue of the host, not in a worker, and are
+    handed to the workers one by one as the running validations of the host finish.
+    Only the last "history" jobs are kept in memory.
+    """
+
+    def __init__(self, max_workers, history=100, host_limit=None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.history = history
+        self.host_limit = host_limit
+        # host -> number of dispatched (running or waiting for a worker) jobs, and jobs waiting for the host
+        self.host_running = {}
+        self.host_pending = {}
+        self.jobs = OrderedDict()
+        self.batches = OrderedDict()
+        self.lock = threading.Lock()
+
+    def submit(self, be_id, target, host=None):
+        """
+        Queues the validation of a backend.
+
+        Parameters
+        ----------
+        be_id : int
+            ID of backend
+        target : function
+            Function executing the validation, called with be_id and the on_event callback of the job,
+            returning the result dictionary
+        host : str
+            Host of the backend, used to limit the concurrent validations per host
+
+        Return
+        ----------
+        job : ValidationJob
+            The queued job.
+        """
+        job = ValidationJob(be_id, host=host)
+        limited = bool(host and self.host_limit)
+        with self.lock:
+            self.jobs[job.id] = job
+            self._cleanup()
+            if limited:
+                if self.host_running.get(host, 0) >= self.host_limit:
+                    self.host_pending.setdefault(host, deque()).append((job, target))
+                    return job
+                self.host_running[host] = self.host_running.get(host, 0) + 1
+        self.executor.submit(self._run, job, target)
+        return job
+
+    def submit_all(self, backends, target):
+        """
+        Queues the validation of several backends as one batch.
+
+        Parameters
+        ----------
+        backends : list
+            List of (be_id, name, host) tuples
+        target : function
+            Function executing the validation, called with be_id and returning the result dictionary
+
+        Return
+        ----------
+        batch : BatchValidation
+            The batch containing a job per backend.
+        """
+        jobs = OrderedDict()
+        for be_id, name, host in backends:
+            jobs[name] = self.submit(be_id, target, host=host)
+        batch = BatchValidation(jobs)
+        with self.lock:
+            self.batches[batch.id] = batch
+            while len(self.batches) > self.history:
+                self.batches.popitem(last=False)
+        return batch
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def get_batch(self, batch_id):
+        with self.lock:
+            return self.batches.get(batch_id)
+
+    def depth(self):
+        """
+        Returns the number of jobs waiting for a free worker.
+        """
+        with self.lock:
+            return len([job for job in self.jobs.values() if job.state == JOB_QUEUED])
+
+    def _cleanup(self):
+        while len(self.jobs) > self.history:
+            old_id = next((j_id for j_id, job in self.jobs.items() if job.done()), None)
+            if not old_id:
+                return
+            del self.jobs[old_id]
+
+    def _run(self, job, target):
+        try:
+            self._execute(job, target)
+        finally:
+            if job.host and self.host_limit:
+                self._release_host(job.host)
+
+    def _release_host(self, host):
+        """
+        Hands the next pending job of a host to the workers, or frees the slot of the host.
+        """
+        with self.lock:
+            pending = self.host_pending.get(host)
+            if pending:
+                job, target = pending.popleft()
+            else:
+                self.host_pending.pop(host, None)
+                self.host_running[host] -= 1
+                if not self.host_running[host]:
+                    del self.host_running[host]
+                return
+        self.executor.submit(self._run, job, target)
+
+    def _execute(self, job, target):
+        job.state = JOB_RUNNING
+        job.started = time.time()
+        with app.app_context():
+            try:
+                result = target(job.be_id, on_event=job.add_event)
+                if isinstance(result, dict):
+                    job.result = result
+                    job.state = JOB_FINISHED
+                else:
+                    job.error = error_message(result)
+                    job.state = JOB_ERROR
+            except Exception as exp:
+                job.error = str(exp)
+                job.state = JOB_ERROR
+            finally:
+                db.session.remove()
+        job.finished = time.time()
+        validations.inc(job.state)
+        with job.condition:
+            job.condition.notify_all()
+
+
+def validate_all(queue, be_ids=None):
+    """
+    Queues the validation of all backends, or only of the given ones. The backends are prepared by the jobs
+    (see run_validation), so that this returns without waiting for config files or specifications.
+
+    Parameters
+    ----------
+    queue : ValidationQueue
+        Queue executing the validations
+    be_ids : list
+        IDs of the backends to validate, all backends if None
+
+    Return
+    ----------
+    batch : BatchValidation
+        The batch containing a job per backend.
+    """
+    backends = Backend.query.order_by(Backend.name)
+    if be_ids:
+        backends = backends.filter(Backend.id.in_(be_ids))
+
+    batch_list = []
+    for backend in backends.all():
+        # the limit applies to the host that is validated, the one of the versioned url of the (cached)
+        # well-known document, which may differ from the host of the registered url
+        batch_list.append((backend.id, backend.name, get_host(backend.get_url())))
+
+    return queue.submit_all(batch_list, run_validation)
+
+
+validation_queue = ValidationQueue(app.config['VALIDATION_WORKERS'], history=app.config['VALIDATION_JOB_HISTORY'],
+                                   host_limit=app.config['VALIDATION_HOST_LIMIT'])
+
+metrics.gauge("openeoct_validation_queue_depth", "Validation jobs waiting for a free worker.",
+              callback=validation_queue.depth)
@@ -0,0 +1,219 @@
+import threading
+import time
+from bisect import bisect_left
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from ..webopeneoct import app
+
+
+# Buckets in seconds, from fast views and queries up to openeoct runs of several minutes
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def escape_label(value):
+    """
+    Escapes backslashes, double quotes and line feeds of a label value, as required by the exposition format.
+    """
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(name, escape_label(value)) for name, value in pairs) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    Base class of the metrics, keeps one value per combination of label values.
+
+    Attributes
+    ----------
+    name : str
+        Name of the metric
+    help : str
+        Description of the metric
+    labelnames : tuple
+        Names of the labels
+    """
+    type = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def samples(self):
+        """
+        Returns the (name, labels, value) samples of the metric.
+        """
+        with self.lock:
+            return [(self.name, format_labels(self.labelnames, labels), value)
+                    for labels, value in sorted(self.values.items())]
+
+    def render(self):
+        lines = ["# HELP {} {}".format(self.name, self.help), "# TYPE {} {}".format(self.name, self.type)]
+        lines.extend("{}{} {}".format(name, labels, format_value(value)) for name, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labelvalues, amount=1):
+        with self.lock:
+            self.values[labelvalues] = self.values.get(labelvalues, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    Gauge whose value is either set or, if a callback is given, read from the callback on every scrape.
+    """
+    type = "gauge"
+
+    def __init__(self, name, help, labelnames=(), callback=None):
+        super().__init__(name, help, labelnames)
+        self.callback = callback
+
+    def set(self, value, *labelvalues):
+        with self.lock:
+            self.values[labelvalues] = value
+
+    def samples(self):
+        if self.callback:
+            return [(self.name, "", self.callback())]
+        return super().samples()
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value, *labelvalues):
+        with self.lock:
+            counts, total = self.values.get(labelvalues, ([0] * len(self.buckets), 0.0))
+            counts[bisect_left(self.buckets, value)] += 1
+            self.values[labelvalues] = (counts, total + value)
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for labels, (counts, total) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    samples.append((self.name + "_bucket",
+                                    format_labels(self.labelnames, labels, ("le", format_value(float(bound)))),
+                                    cumulative))
+                samples.append((self.name + "_sum", format_labels(self.labelnames, labels), total))
+                samples.append((self.name + "_count", format_labels(self.labelnames, labels), cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Minimal registry of the metrics of the web application, rendered in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=(), callback=None):
+        return self.register(Gauge(name, help, labelnames, callback=callback))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets=buckets))
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics)
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+metrics = MetricsRegistry()
+
+view_duration = metrics.histogram("openeoct_view_duration_seconds", "Duration of the requests per view.",
+                                  ("view", "method", "status"))
+subprocess_duration = metrics.histogram("openeoct_subprocess_duration_seconds",
+                                        "Wall time of the openeoct and pytest processes.", ("command",))
+subprocess_exits = metrics.counter("openeoct_subprocess_exits_total",
+                                   "Finished openeoct and pytest processes by exit status.", ("command", "status"))
+db_query_duration = metrics.histogram("openeoct_db_query_duration_seconds", "Duration of the database queries.",
+                                      ("statement",))
+validations = metrics.counter("openeoct_validations_total", "Finished validation jobs by state.", ("state",))
+
+
+def observe_subprocess(command, start, returncode):
+    """
+    Records wall time and exit status of a finished process.
+
+    Parameters
+    ----------
+    command : str
+        Name of the command, e.g. "openeoct"
+    start : float
+        time.monotonic() when the process was started
+    returncode : int
+        Exit status of the process
+    """
+    subprocess_duration.observe(time.monotonic() - start, command)
+    subprocess_exits.inc(command, str(returncode))
+
+
+@app.before_request
+def start_view_timer():
+    g.metrics_start = time.monotonic()
+
+
+@app.after_request
+def observe_view(response):
+    start = g.pop("metrics_start", None)
+    if start is not None:
+        view_duration.observe(time.monotonic() - start, request.endpoint or "none", request.method,
+                              str(response.status_code))
+    return response
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_start", []).append(time.monotonic())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def observe_query(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("metrics_start")
+    if starts:
+        db_query_duration.observe(time.monotonic() - starts.pop(), (statement.split(None, 1) or ["none"])[0].upper())
+
+
+@event.listens_for(Engine, "handle_error")
+def discard_query_timer(context):
+    # failed queries are not observed, but their start time must not be used for the next query
+    if context.connection is not None:
+        starts = context.connection.info.get("metrics_start")
+        if starts:
+            starts.pop()
@@ -1,9 +1,11 @@
 from openeoct.flask.webopeneoct import db
-import requests
+from sqlalchemy import event, inspect
+import json
 import os
 #import pathlib
 from pathlib import PosixPath, Path
 from ..webopeneoct import app
+from .cache import get_well_known, invalidate_well_known, backend_choices_cache
 # from .service import BodyHandler
 
 
@@ -11,6 +13,7 @@ class Backend(db.Model):
     """
     Backend class that contains all information related to a backend,
     including a many-to-one relation to the Endpoint instance.
+    The revision is increased on every change of the backend, its endpoints or variables (see bump_revisions).
     """
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     name = db.Column(db.String, unique=True, nullable=False)
@@ -21,9 +24,11 @@ class Backend(db.Model):
     authurl = db.Column(db.String)
     username = db.Column(db.String)
     password = db.Column(db.String)
+    revision = db.Column(db.Integer, nullable=False, default=0)
 
-    endpoints = db.relationship("Endpoint", lazy="dynamic")
-    variables = db.relationship("Variable", lazy="dynamic")
+    # loaded on first access, or together with the backend by Backend.query.options(selectinload(...))
+    endpoints = db.relationship("Endpoint", cascade="all, delete-orphan")
+    variables = db.relationship("Variable", cascade="all, delete-orphan")
 
     def __init__(self, id, name, url, openapi, output=None, authurl=None, username=None, password=None, version=None):
         self.id = id
@@ -38,10 +43,14 @@ class Backend(db.Model):
         self.password = password
 
     def delete(self):
-        for ep in self.endpoints:
-            db.session.delete(ep)
-        for va in self.variables:
-            db.session.delete(va)
+        # the endpoints and variables are deleted by the cascade of the relations
+        for run in ValidationRun.query.filter(ValidationRun.backend == self.id):
+            db.session.delete(run)
+        for snapshot in CapabilitiesSnapshot.query.filter(CapabilitiesSnapshot.backend == self.id):
+            db.session.delete(snapshot)
+        health = BackendHealth.query.get(self.id)
+        if health:
+            db.session.delete(health)
         db.session.delete(self)
 
     def set(self, backend):
@@ -54,6 +63,9 @@ class Backend(db.Model):
            Backend instance
 
         """
+        if self.url != backend.url or self.version != backend.version:
+            invalidate_well_known(self.url)
+            invalidate_well_known(backend.url)
         self.name = backend.name
         self.url = backend.url
         self.openapi = backend.openapi
@@ -64,24 +76,27 @@ class Backend(db.Model):
         self.version = backend.version
 
     def get_url(self):
+        """
+        Returns the url of the backend version, looked up in the (cached) well-known document of the backend.
+        """
         if not self.version:
             return self.url
-        try:
-            resp = requests.get(self.url + "/.well-known/openeo")
-            versions = resp.json()
-            if versions.get("versions"):
-                for version in versions.get("versions"):
-                    if version.get("api_version") == self.version:
-                        return version.get("url")
-        except:
-            return self.url
+
+        versions = get_well_known(self.url)
+        if isinstance(versions, dict) and versions.get("versions"):
+            for version in versions.get("versions"):
+                if version.get("api_version") == self.version:
+                    return version.get("url")
 
         return self.url
 
     def append_config(self, conf_json):
 
+        if "url" in conf_json or "backendversion" in conf_json:
+            invalidate_well_known(self.url)
         if "url" in conf_json:
             self.url = conf_json["url"]
+            invalidate_well_known(self.url)
         if "openapi" in conf_json:
             self.openapi = conf_json["openapi"]
         if "username" in conf_json:
@@ -90,39 +105,92 @@ class Backend(db.Model):
             self.version = conf_json["backendversion"]
         if "authurl" in conf_json:
             self.authurl = conf_json["authurl"]
+        # the id is needed for the new variables and endpoints
+        if self.id is None:
+            db.session.flush()
+
+        new_rows = []
         if "variables" in conf_json:
-            if not self.variables:
-                self.variables = []
+            existing_vars = self.get_variable_index()
             for nam, val in conf_json["variables"].items():
                 variable = Variable(name=nam, value=val, backend=self.id)
-                self.append_variable(variable)
+                if self.append_variable(variable, existing_vars):
+                    new_rows.append(variable)
         if "endpoints" in conf_json:
-            if not self.endpoints:
-                self.endpoints = []
+            existing_eps = self.get_endpoint_index()
             for nam, val in conf_json["endpoints"].items():
                 endpoint = Endpoint(backend=self.id, url=None, type=None, id=nam)
                 endpoint.from_json(val)
-                self.append_endpoint(endpoint)
-
-    def append_variable(self, variable):
-        for existing_var in self.variables:
-            if existing_var.name == variable.name:
-                existing_var.value = variable.value
-                db.session.commit()
-                return
+                if self.append_endpoint(endpoint, existing_eps):
+                    new_rows.append(endpoint)
+
+        db.session.add_all(new_rows)
+
+    def get_variable_index(self):
+        """
+        Returns the variables of the backend as dictionary keyed by name, loaded with one query.
+        """
+        return {variable.name: variable for variable in self.variables}
+
+    def get_endpoint_index(self):
+        """
+        Returns the endpoints of the backend as dictionary keyed by id, loaded with one query.
+        """
+        return {endpoint.id: endpoint for endpoint in self.endpoints}
+
+    def append_variable(self, variable, existing_vars=None):
+        """
+        Merges a variable into the variables of the backend. An existing variable with the same name is updated.
+
+        Parameters
+        ----------
+        variable : Variable
+            Variable instance
+        existing_vars : dict
+            Variables of the backend keyed by name (see get_variable_index), new variables are added to it.
+            Loaded from the database if None.
+
+        Return
+        ----------
+        new : bool
+            True if the variable is new and has to be added to the session by the caller.
+        """
+        if existing_vars is None:
+            existing_vars = self.get_variable_index()
+        existing_var = existing_vars.get(variable.name)
+        if existing_var:
+            existing_var.value = variable.value
+            return False
         variable.backend = self.id
-        self.variables.append(variable)
-        db.session.add(variable)
-
-    def append_endpoint(self, endpoint):
-        for existing_ep in self.endpoints:
-            if existing_ep.id == endpoint.id:
-                existing_ep.set(endpoint)
-                db.session.commit()
-                return
+        existing_vars[variable.name] = variable
+        return True
+
+    def append_endpoint(self, endpoint, existing_eps=None):
+        """
+        Merges an endpoint into the endpoints of the backend. An existing endpoint with the same id is updated.
+
+        Parameters
+        ----------
+        endpoint : Endpoint
+            Endpoint instance
+        existing_eps : dict
+            Endpoints of the backend keyed by id (see get_endpoint_index), new endpoints are added to it.
+            Loaded from the database if None.
+
+        Return
+        ----------
+        new : bool
+            True if the endpoint is new and has to be added to the session by the caller.
+        """
+        if existing_eps is None:
+            existing_eps = self.get_endpoint_index()
+        existing_ep = existing_eps.get(endpoint.id)
+        if existing_ep:
+            existing_ep.set(endpoint)
+            return False
         endpoint.backend = self.id
-        self.endpoints.append(endpoint)
-        db.session.add(endpoint)
+        existing_eps[endpoint.id] = endpoint
+        return True
 
     def to_json(self):
         endpoint_list = {}
@@ -156,6 +224,72 @@ class Backend(db.Model):
         return json_dict
 
 
+@event.listens_for(db.session, "before_flush")
+def bump_revisions(session, flush_context, instances):
+    """
+    Increases the revision of every backend that is changed itself or whose endpoints or variables are
+    added, changed or deleted in this flush.
+    """
+    be_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Backend):
+            if obj not in session.new and session.is_modified(obj, include_collections=False):
+                be_ids.add(obj.id)
+        elif isinstance(obj, (Endpoint, Variable)):
+            if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+                continue
+            if obj.backend is not None:
+                be_ids.add(int(obj.backend))
+
+    with session.no_autoflush:
+        for be_id in be_ids:
+            backend = session.query(Backend).get(be_id)
+            if backend and backend not in session.deleted:
+                backend.revision = (backend.revision or 0) + 1
+
+
+@event.listens_for(db.session, "after_flush")
+def track_backend_changes(session, flush_context):
+    """
+    Marks the session if a backend was added, renamed or deleted in this flush, so that the cached backend
+    choices are invalidated once the transaction is committed.
+    """
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Backend):
+            session.info["backend_choices_changed"] = True
+            return
+    for obj in session.dirty:
+        if isinstance(obj, Backend) and inspect(obj).attrs.name.history.has_changes():
+            session.info["backend_choices_changed"] = True
+            return
+
+
+@event.listens_for(db.session, "after_commit")
+def invalidate_backend_choices(session):
+    if session.info.pop("backend_choices_changed", False):
+        backend_choices_cache.clear()
+
+
+@event.listens_for(db.session, "after_rollback")
+def discard_backend_changes(session):
+    session.info.pop("backend_choices_changed", None)
+
+
+def get_backend_choices():
+    """
+    Returns the choices of the backend select fields, the (id, name) pairs of all backends ordered by name.
+    The list is cached until a backend is added, renamed or deleted.
+    """
+    hit, choices = backend_choices_cache.get("choices")
+    if hit:
+        return choices
+
+    choices = [(backend.id, backend.name) for backend in
+               Backend.query.with_entities(Backend.id, Backend.name).order_by(Backend.name).all()]
+    backend_choices_cache.set("choices", choices)
+    return choices
+
+
 class Variable(db.Model):
     """
     Class that contains variables
@@ -167,6 +301,9 @@ class Variable(db.Model):
 
     backend = db.Column(db.Integer, db.ForeignKey('backend.id'))
 
+    # not unique, databases of older versions may contain several variables with the same name
+    __table_args__ = (db.Index("ix_variable_backend_name", "backend", "name"),)
+
     def __init__(self, name, value, backend=None):
         self.name = name
         self.value = value
@@ -194,6 +331,11 @@ class Endpoint(db.Model):
 
     backend = db.Column(db.Integer, db.ForeignKey('backend.id'), primary_key=True)
 
+    __table_args__ = (db.Index("ix_endpoint_backend_id", "backend", "id"),
+                      db.Index("ix_endpoint_group_id", "group", "id"),
+                      db.Index("ix_endpoint_type", "type"),
+                      db.Index("ix_endpoint_url", "url"))
+
     def __init__(self, backend, url, type, id=None, body=None, head=None, auth=None, optional=False,
                  group="nogroup", timeout=None, order=None, wait=None, retry=None):
         self.backend = backend
@@ -233,7 +375,9 @@ class Endpoint(db.Model):
         self.retry = endpoint.retry
 
     def to_json(self):
+        # the id is given explicitly, the tools would take it from the key otherwise, which breaks ids with dots
         endpoint_dict = {
+            "id": self.id,
             "url": self.url,
             "request_type": self.type
         }
@@ -280,6 +424,207 @@ class Endpoint(db.Model):
         if "retrycode" in ep_json:
             self.retry = ep_json["retrycode"]
 
+
+class ValidationRun(db.Model):
+    """
+    Class that contains one validation run of a backend,
+    including a one-to-many relation to the GroupResult and EndpointResult instances.
+    """
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    backend = db.Column(db.Integer, db.ForeignKey('backend.id'), nullable=False)
+    started = db.Column(db.DateTime, index=True)
+    finished = db.Column(db.DateTime)
+    state = db.Column(db.String)
+    stats = db.Column(db.Text)
+
+    groups = db.relationship("GroupResult", lazy="dynamic", cascade="all, delete-orphan")
+    endpoints = db.relationship("EndpointResult", lazy="dynamic", cascade="all, delete-orphan")
+
+    __table_args__ = (db.Index("ix_validation_run_backend_started", "backend", "started"),)
+
+    def __init__(self, backend, started=None, finished=None, state=None, stats=None):
+        self.backend = backend
+        self.started = started
+        self.finished = finished
+        self.state = state
+        self.stats = stats
+
+    def to_json(self):
+        """
+        Returns the run in the result format of the openeoct tool.
+        """
+        result = {}
+        for group in self.groups:
+            result[group.name] = {"group_summary": group.summary, "endpoints": {}}
+        for endpoint in self.endpoints:
+            group = result.setdefault(endpoint.group, {"group_summary": "", "endpoints": {}})
+            group["endpoints"][endpoint.endpoint] = endpoint.to_json()
+
+        return {
+            "result": result,
+            "stats": json.loads(self.stats) if self.stats else {}
+        }
+
+
+class GroupResult(db.Model):
+    """
+    Class that contains the summary of an endpoint group of a validation run.
+    """
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    run = db.Column(db.Integer, db.ForeignKey('validation_run.id'), nullable=False, index=True)
+    name = db.Column(db.String, nullable=False)
+    summary = db.Column(db.String)
+
+    def __init__(self, run, name, summary):
+        self.run = run
+        self.name = name
+        self.summary = summary
+
+
+class EndpointResult(db.Model):
+    """
+    Class that contains the state of an endpoint in a validation run.
+    """
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    run = db.Column(db.Integer, db.ForeignKey('validation_run.id'), nullable=False, index=True)
+    group = db.Column(db.String)
+    endpoint = db.Column(db.String, nullable=False)
+    url = db.Column(db.String)
+    type = db.Column(db.String)
+    state = db.Column(db.String, index=True)
+    message = db.Column(db.Text)
+    # Timing of the request to the backend, None if no request was sent
+    duration_ms = db.Column(db.Integer)
+    size = db.Column(db.Integer)
+    retries = db.Column(db.Integer)
+
+    __table_args__ = (db.Index("ix_endpoint_result_run_endpoint", "run", "endpoint"),)
+
+    def __init__(self, run, group, endpoint, url=None, type=None, state=None, message=None, duration_ms=None,
+                 size=None, retries=None):
+        self.run = run
+        self.group = group
+        self.endpoint = endpoint
+        self.url = url
+        self.type = type
+        self.state = state
+        self.message = message
+        self.duration_ms = duration_ms
+        self.size = size
+        self.retries = retries
+
+    def to_json(self):
+        ep_json = {
+            "url": self.url,
+            "type": self.type,
+            "state": self.state,
+            "message": self.message
+        }
+        # like the openeoct tool, the timing is given as strings and only if a request was sent
+        if self.duration_ms is not None:
+            ep_json["duration_ms"] = str(self.duration_ms)
+            ep_json["size"] = str(self.size or 0)
+            ep_json["retries"] = str(self.retries or 0)
+        return ep_json
+
+
+class CapabilitiesSnapshot(db.Model):
+    """
+    Class that contains the endpoints listed in the capabilities of a backend at one point in time, with the
+    ETag/Last-Modified of the response for conditional requests and the options of the last endpoint generation
+    based on it.
+    """
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    backend = db.Column(db.Integer, db.ForeignKey('backend.id'), nullable=False)
+    url = db.Column(db.String)
+    etag = db.Column(db.String)
+    last_modified = db.Column(db.String)
+    digest = db.Column(db.String)
+    # JSON list of [path, [methods]] in the order of the capabilities
+    endpoints = db.Column(db.Text)
+    fetched = db.Column(db.DateTime)
+    checked = db.Column(db.DateTime)
+    # options ("<methods>|<leave_ids>") and backend revision of the last generation, see service.gen_endpoints
+    gen_options = db.Column(db.String)
+    gen_revision = db.Column(db.Integer)
+
+    __table_args__ = (db.Index("ix_capabilities_snapshot_backend_id", "backend", "id"),)
+
+    def __init__(self, backend, url, endpoints, digest, etag=None, last_modified=None, fetched=None):
+        self.backend = backend
+        self.url = url
+        self.endpoints = json.dumps(endpoints)
+        self.digest = digest
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched = fetched
+        self.checked = fetched
+
+    def get_endpoints(self):
+        return json.loads(self.endpoints) if self.endpoints else []
+
+    def endpoint_keys(self):
+        """
+        Returns the endpoints as set of "METHOD path" strings.
+        """
+        return {"{} {}".format(method, path) for path, methods in self.get_endpoints() for method in methods}
+
+
+class BackendHealth(db.Model):
+    """
+    Class that contains the result of the latest health probe of a backend (see health.HealthProber): status and
+    latency (in seconds) of its /.well-known/openeo document and of its capabilities.
+    """
+    backend = db.Column(db.Integer, db.ForeignKey('backend.id'), primary_key=True)
+    healthy = db.Column(db.Boolean, default=False)
+    well_known_status = db.Column(db.Integer)
+    well_known_latency = db.Column(db.Float)
+    capabilities_url = db.Column(db.String)
+    capabilities_status = db.Column(db.Integer)
+    capabilities_latency = db.Column(db.Float)
+    error = db.Column(db.String)
+    checked = db.Column(db.DateTime)
+
+    def to_json(self):
+        return {
+            "backend": self.backend,
+            "healthy": self.healthy,
+            "well_known_status": self.well_known_status,
+            "well_known_latency": self.well_known_latency,
+            "capabilities_url": self.capabilities_url,
+            "capabilities_status": self.capabilities_status,
+            "capabilities_latency": self.capabilities_latency,
+            "error": self.error,
+            "checked": self.checked.isoformat() if self.checked else None
+        }
+
+
+# columns added to the tables of existing databases, db.create_all only creates missing tables
+SCHEMA_UPGRADES = [
+    ("backend", "revision", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+
+def upgrade_schema():
+    """
+    Brings the tables of an existing database up to date, since db.create_all neither adds columns nor indexes to
+    existing tables: adds the missing columns of SCHEMA_UPGRADES and creates the missing indexes of all models.
+    """
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    for table, column, definition in SCHEMA_UPGRADES:
+        if table in tables and column not in {col["name"] for col in inspector.get_columns(table)}:
+            db.engine.execute('ALTER TABLE "{}" ADD COLUMN "{}" {}'.format(table, column, definition))
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+
+
 # class Result:
 #     """
 #     Result class that contains all information related to an result of an validation.
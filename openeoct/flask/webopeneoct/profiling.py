@@ -0,0 +1,179 @@
+import cProfile
+import pstats
+import threading
+import time
+import uuid
+from collections import deque
+from urllib.parse import urlencode
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from ..webopeneoct import app
+
+
+class RequestProfile:
+    """
+    Profile of one request: the cProfile profiler plus the SQL statements and the requests to the backends
+    issued while handling it.
+
+    Attributes
+    ----------
+    id : str
+        Identifier of the profile
+    forced : bool
+        True if the profile was requested with the profile token, then it is kept regardless of the threshold
+    queries : list
+        (statement, seconds) tuples of the SQL statements
+    http : list
+        (method, url, status, seconds) tuples of the requests to the backends
+    frames : list
+        Top frames by cumulative time, filled when the request is finished
+    """
+
+    def __init__(self, forced=False):
+        self.id = uuid.uuid4().hex
+        self.forced = forced
+        self.started = time.time()
+        self.start = time.monotonic()
+        self.duration = None
+        # the profile token is not kept
+        args = [(key, value) for key, value in request.args.items(multi=True) if key != "profile"]
+        self.path = request.path + ("?" + urlencode(args) if args else "")
+        self.view = request.endpoint
+        self.method = request.method
+        self.status = None
+        self.queries = []
+        self.http = []
+        self.frames = []
+        self.profiler = cProfile.Profile()
+
+    def finish(self, status, top_frames):
+        self.profiler.disable()
+        self.duration = time.monotonic() - self.start
+        self.status = status
+        stats = pstats.Stats(self.profiler)
+        frames = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:top_frames]
+        self.frames = [
+            {"function": "{}:{}({})".format(filename, line, function), "calls": calls, "total": total,
+             "cumulative": cumulative}
+            for (filename, line, function), (_, calls, total, cumulative, _) in frames
+        ]
+        # the profiler holds references to the profiled code, it is not needed anymore
+        self.profiler = None
+
+    def to_json(self):
+        return {
+            "id": self.id,
+            "path": self.path,
+            "view": self.view,
+            "method": self.method,
+            "status": self.status,
+            "started": self.started,
+            "duration": self.duration,
+            "frames": self.frames,
+            "queries": [{"statement": statement, "duration": duration} for statement, duration in self.queries],
+            "http": [{"method": method, "url": url, "status": status, "duration": duration}
+                     for method, url, status, duration in self.http]
+        }
+
+
+class ProfileStore:
+    """
+    Keeps the profiles of the last "history" slow requests in memory.
+    """
+
+    def __init__(self, history=50):
+        self.profiles = deque(maxlen=history)
+        self.lock = threading.Lock()
+
+    def add(self, profile):
+        with self.lock:
+            self.profiles.append(profile)
+
+    def get(self, profile_id):
+        with self.lock:
+            return next((profile for profile in self.profiles if profile.id == profile_id), None)
+
+    def list(self):
+        with self.lock:
+            return list(reversed(self.profiles))
+
+
+profile_store = ProfileStore(app.config['PROFILE_HISTORY'])
+
+
+def current_profile():
+    """
+    Returns the profile of the current request, None if it is not profiled.
+    """
+    if not has_request_context():
+        return None
+    return g.get("profile")
+
+
+def has_profile_token():
+    token = app.config['PROFILE_TOKEN']
+    return bool(token) and request.args.get("profile") == token
+
+
+def record_http(method, url, status, duration):
+    """
+    Records a request to a backend in the profile of the current request, if it is profiled.
+    """
+    profile = current_profile()
+    if profile:
+        profile.http.append((method, url, status, duration))
+
+
+@app.before_request
+def start_profile():
+    forced = has_profile_token()
+    if not (forced or app.config['PROFILE_REQUESTS']):
+        return
+    profile = RequestProfile(forced=forced)
+    try:
+        profile.profiler.enable()
+    except ValueError:
+        # another profiler is already active in this thread
+        return
+    g.profile = profile
+
+
+@app.after_request
+def finish_profile(response):
+    profile = g.pop("profile", None)
+    if profile:
+        profile.finish(response.status_code, app.config['PROFILE_TOP_FRAMES'])
+        if profile.forced or profile.duration >= app.config['PROFILE_THRESHOLD']:
+            profile_store.add(profile)
+    return response
+
+
+@app.teardown_request
+def discard_profile(exc):
+    # after_request is skipped if the view failed, the profiler still has to be stopped
+    profile = g.pop("profile", None)
+    if profile:
+        profile.profiler.disable()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_profile_query(conn, cursor, statement, parameters, context, executemany):
+    if current_profile():
+        conn.info.setdefault("profile_start", []).append(time.monotonic())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def record_profile_query(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile()
+    starts = conn.info.get("profile_start")
+    if profile and starts:
+        profile.queries.append((statement, time.monotonic() - starts.pop()))
+
+
+@event.listens_for(Engine, "handle_error")
+def discard_profile_query(context):
+    if context.connection is not None:
+        starts = context.connection.info.get("profile_start")
+        if starts:
+            starts.pop()
@@ -1,23 +1,48 @@
-from .models import Backend, Endpoint
+from .models import Backend, Endpoint, ValidationRun, GroupResult, EndpointResult, CapabilitiesSnapshot
 from openeoct.flask.webopeneoct import db
+from sqlalchemy import and_, func, event, inspect
+import hashlib
 import json
+import requests
 import toml
 import subprocess
-import os
+import threading
 import time
+import os
+import re
+from collections.abc import Mapping
+from datetime import datetime
 from shutil import copyfile
-import requests
-import uuid
+from urllib.parse import urlparse
 from ..webopeneoct import app
+from .httpclient import http_client
+from .cache import body_cache
+from .metrics import observe_subprocess
+from .engine import validate_backend, engine_available, AuthenticationError
+from .specs import spec_registry, is_remote
 
 WORKING_DIR = "../.."
 PYTEST_DIR = "../../../openeo_compliance_tests/"
 PYTEST_CMD = "/home/bgoesswe/.pyenv/versions/miniconda3-latest/envs/openeoct/bin/pytest"
 
 
+# revision and specification of the backend each cached config file was created from, keyed by (backend id, plainpwd)
+config_revisions = {}
+
+
+def get_config_path(be_id, plainpwd=True):
+    """
+    Returns the path of the config file of a backend, the censored variant (plainpwd False) has its own file.
+    """
+    if plainpwd:
+        return "config_{}.toml".format(str(be_id))
+    return "config_{}_censored.toml".format(str(be_id))
+
+
 def create_configfile(be_id, plainpwd=True):
     """
     Creates the toml config file for the openeoct tool, according to the config stored in the database.
+    If the backend did not change since the file was created (see Backend.revision), the existing file is reused.
 
     Parameters
     ----------
@@ -30,11 +55,25 @@ def create_configfile(be_id, plainpwd=True):
         Path of the created config file.
 
     """
-    backend = Backend.query.filter(Backend.id == be_id).first()
+    config_path = get_config_path(be_id, plainpwd)
+    cache_key = (int(be_id), plainpwd)
 
-    config_path = "config_{}.toml".format(str(backend.id))
+    row = db.session.query(Backend.revision, Backend.openapi).filter(Backend.id == be_id).first()
+    if not row:
+        return None
+    # the openeoct tool reads the local mirror instead of downloading the specification on every run, the mirror is
+    # only looked up here, it is downloaded by prepare_validation
+    openapi = row.openapi
+    if is_remote(openapi):
+        openapi = spec_registry.local_path(openapi, fetch=False) or openapi
+    if config_revisions.get(cache_key) == (row.revision, openapi) and os.path.isfile(config_path):
+        return config_path
+
+    backend = Backend.query.filter(Backend.id == be_id).first()
 
     toml_dict = backend.to_json()
+    if "openapi" in toml_dict:
+        toml_dict["openapi"] = openapi
 
     if not plainpwd:
         if "password" in toml_dict:
@@ -45,9 +84,46 @@ def create_configfile(be_id, plainpwd=True):
     with open(config_path, "w") as text_file:
         text_file.write(new_toml_string)
         text_file.close()
+
+    config_revisions[cache_key] = (backend.revision, openapi)
     return config_path
 
 
+def prepare_validation(be_id):
+    """
+    Prepares the validation of a backend, by setting its output file and recreating its config file.
+
+    Parameters
+    ----------
+    be_id : int
+        ID of Backend
+
+    Return
+    ----------
+    config_path : String
+        Path of the created config file.
+
+    """
+    backend = Backend.query.filter(Backend.id == be_id).first()
+
+    if backend.output == "result_None.json" or not backend.output:
+        backend.output = "result_{}.json".format(backend.id)
+        db.session.commit()
+
+    # revalidates the mirror of a remote specification, the config file refers to the mirror (see create_configfile)
+    if is_remote(backend.openapi):
+        spec_registry.local_path(backend.openapi)
+
+    return create_configfile(be_id=be_id)
+
+
+def get_host(url):
+    """
+    Returns the host (network location) of an url, used to limit the concurrent requests per host.
+    """
+    return urlparse(url).netloc
+
+
 def read_file(file_path):
     with open(file_path) as file:
         file_data = file.read()
@@ -81,68 +157,178 @@ def common_member(a, b):
     return(False)
 
 
+def fetch_capabilities(backend):
+    """
+    Returns the latest capabilities snapshot of a backend. The capabilities are requested with the ETag and
+    Last-Modified of the latest snapshot (if there is one), a new snapshot is only stored if the listed endpoints
+    changed.
+    Only the last CAPABILITIES_HISTORY snapshots of a backend are kept.
+
+    Parameters
+    ----------
+    backend : Backend
+        Backend instance
+
+    Return
+    ----------
+    snapshot : CapabilitiesSnapshot
+        The latest snapshot
+    changed : bool
+        True if the endpoints changed, i.e. the snapshot is new.
+    """
+    url = backend.get_url()
+    latest = CapabilitiesSnapshot.query.filter(CapabilitiesSnapshot.backend == backend.id). \
+        order_by(CapabilitiesSnapshot.id.desc()).first()
+    if latest and latest.url != url:
+        latest = None
+
+    headers = {}
+    if latest and latest.etag:
+        headers["If-None-Match"] = latest.etag
+    if latest and latest.last_modified:
+        headers["If-Modified-Since"] = latest.last_modified
+
+    resp = http_client.get(url, headers=headers)
+    if resp.status_code == 304:
+        if latest:
+            latest.checked = datetime.now()
+            db.session.commit()
+            return latest, False
+        # a 304 without a snapshot to refer to, e.g. from a cache in between, the document is requested in full
+        resp = http_client.get(url, headers={"Cache-Control": "no-cache"})
+        if resp.status_code == 304:
+            raise requests.HTTPError("Unexpected 304 response for the capabilities of " + url, response=resp)
+    resp.raise_for_status()
+
+    endpoints = [[ep["path"], list(ep.get("methods", []))] for ep in resp.json()["endpoints"] if "path" in ep]
+    digest = hashlib.sha256(json.dumps(endpoints).encode("utf-8")).hexdigest()
+    etag = resp.headers.get("ETag")
+    last_modified = resp.headers.get("Last-Modified")
+
+    if latest and latest.digest == digest:
+        latest.etag = etag
+        latest.last_modified = last_modified
+        latest.checked = datetime.now()
+        db.session.commit()
+        return latest, False
+
+    snapshot = CapabilitiesSnapshot(backend.id, url, endpoints, digest, etag=etag, last_modified=last_modified,
+                                    fetched=datetime.now())
+    db.session.add(snapshot)
+    db.session.flush()
+
+    old_ids = [row.id for row in db.session.query(CapabilitiesSnapshot.id).
+               filter(CapabilitiesSnapshot.backend == backend.id).order_by(CapabilitiesSnapshot.id.desc()).
+               offset(app.config['CAPABILITIES_HISTORY'])]
+    if old_ids:
+        CapabilitiesSnapshot.query.filter(CapabilitiesSnapshot.id.in_(old_ids)).delete(synchronize_session=False)
+    db.session.commit()
+
+    return snapshot, True
+
+
+def diff_capabilities(old, new):
+    """
+    Compares the endpoints of two capabilities snapshots.
+
+    Parameters
+    ----------
+    old : CapabilitiesSnapshot
+        The earlier snapshot, None if there is none
+    new : CapabilitiesSnapshot
+        The later snapshot
+
+    Return
+    ----------
+    changes : dict
+        "added" and "removed": sorted lists of "METHOD path" strings.
+    """
+    old_keys = old.endpoint_keys() if old else set()
+    new_keys = new.endpoint_keys()
+    return {"added": sorted(new_keys - old_keys), "removed": sorted(old_keys - new_keys)}
+
+
 def gen_endpoints(be_id, re_types=["GET"], leave_ids=True):
     """
     Generates an endpoint in the config file for each endpoint listed in the capabilities page of the backend.
-    If an endpoint does already exists, it is not overwritten but ignored.
+    If an endpoint does already exists, it is not overwritten but ignored. The new endpoints are determined in memory
+    and inserted in one transaction.
+    If neither the capabilities (see fetch_capabilities) nor the backend changed since the last generation with the
+    same options, it returns immediately.
     Parameters
     ----------
     be_id : int
         ID of Backend
     Return
     ----------
-    result_list : list
+    ep_list : list
         List of Endpoint instances that have been added, empty if no endpoint was added.
+    skipped : list
+        List of "METHOD path" strings of the capabilities endpoints that already exist at the backend,
+        None if nothing changed since the last generation.
     """
     ep_list = []
+    skipped = []
     backend = Backend.query.filter(Backend.id == be_id).first()
 
     if not backend:
-        return []
+        return [], []
 
-    resp = requests.get(backend.get_url())
-    capabilities = resp.json()
+    snapshot, changed = fetch_capabilities(backend)
+    gen_options = "{}|{}".format(",".join(sorted(re_types)), int(leave_ids))
+    if not changed and snapshot.gen_options == gen_options and snapshot.gen_revision == backend.revision:
+        return [], None
 
     endpoints = Endpoint.query.filter(Endpoint.backend == backend.id).all()
 
     url_dict = {}
+    ep_ids = set()
 
     # Existing endpoint urls of the backend
     for ep in endpoints:
+        ep_ids.add(ep.id)
         if ep.url in url_dict:
             url_dict[ep.url].append(ep.type)
         else:
             url_dict[ep.url] = [ep.type]
 
-    for ep in capabilities["endpoints"]:
+    for path, methods in snapshot.get_endpoints():
 
-        if "methods" in ep:
-            if not common_member(re_types, ep["methods"]):
-                continue
+        if not common_member(re_types, methods):
+            continue
 
-        if "path" in ep:
+        if leave_ids:
+            if "{" in path:
+                continue
+        for met in methods:
 
-            if leave_ids:
-                if "{" in ep["path"]:
+            if met not in re_types:
+                continue
+            if path in url_dict:
+                if met in url_dict[path]:
+                    skipped.append("{} {}".format(met, path))
                     continue
-            for met in ep["methods"]:
 
-                if met not in re_types:
-                    continue
-                if ep["path"] in url_dict:
-                    if met in url_dict[ep["path"]]:
-                        continue
+            new_ep = Endpoint(backend.id, path, met)
+            new_ep.id = path.replace("/", "") + "_gen"
+            # several methods of the same path would get the same id
+            if new_ep.id in ep_ids:
+                new_ep.id = "{}_{}".format(new_ep.id, met.lower())
 
-                new_ep = Endpoint(be_id, ep["path"], met)
-                new_ep.id = ep["path"].replace("/", "") + "_gen"
+            ep_ids.add(new_ep.id)
+            url_dict.setdefault(path, []).append(met)
+            ep_list.append(new_ep)
 
-                db.session.add(new_ep)
-                db.session.commit()
-                ep_list.append(new_ep)
-                # print(ep)
+    if ep_list:
+        db.session.add_all(ep_list)
+        db.session.commit()
 
     create_configfile(be_id)
-    return ep_list
+
+    snapshot.gen_options = gen_options
+    snapshot.gen_revision = backend.revision
+    db.session.commit()
+    return ep_list, skipped
 
 
 def configs_to_backend(file_paths, name):
@@ -154,6 +340,7 @@ def configs_to_backend(file_paths, name):
     for file in file_paths:
         config_json = read_configfile(file)
         backend.append_config(config_json)
+        db.session.commit()
 
     return backend
 
@@ -173,54 +360,181 @@ def read_result(be_id):
         List of Result instances.
 
     """
-    time.sleep(1)
     backend = Backend.query.filter(Backend.id == be_id).first()
 
-    if backend.output == "result_None.json":
-        backend.output = "result_{}.json".format(backend.id)
-        db.session.commit()
+    output = backend.output
+    if not output or output == "result_None.json":
+        output = "result_{}.json".format(backend.id)
 
-    result_path = "{}/{}".format(WORKING_DIR, backend.output)
+    result_path = "{}/{}".format(WORKING_DIR, output)
 
     if os.path.isfile(result_path):
-        result_file = open("{}/{}".format(WORKING_DIR, backend.output), "r")
+        with open(result_path, "r") as result_file:
+            return json.load(result_file)
+    return None
 
-        result = json.loads(result_file.read())
 
-        # result_list = []
-        #
-        # for key, val in result.items():
-        #     result_list.append(Result(key, val))
+def parse_result(output):
+    """
+    Parses the results the openeoct tool wrote to stdout (see the "--stdout" flag).
 
-        return result
-    return None
+    Parameters
+    ----------
+    output : bytes
+        Stdout of the openeoct process
+
+    Return
+    ----------
+    result : dict
+        Validation results, None if the output does not contain valid results.
 
+    """
+    try:
+        return json.loads(output)
+    except ValueError:
+        return None
 
-def run_validation(be_id):
+
+def execute_openeoct(be_id, config_paths):
     """
-    Run validation of backend. First recreates the config file and then executes the configuration.
+    Executes the openeoct tool with the given config files and returns its results. The results are handed over
+    directly via stdout, unless RESULT_FROM_FILE is set, then they are read from the output file of the backend.
 
     Parameters
     ----------
     be_id : int
         ID of backend
+    config_paths : list
+        Paths of the config files
+
+    Return
+    ----------
+    result : dict
+        Validation results, None if there are no results.
+    err : bytes
+        Stderr of the openeoct process, empty if successful.
     """
-    # config_path = create_configfile(be_id)
+    from_file = app.config['RESULT_FROM_FILE']
 
-    config_path = "config_{}.toml".format(str(be_id))
+    cmd = ['./openeoct']
+    if not from_file:
+        cmd.append('--stdout')
+    cmd.append('config')
+    cmd.extend(config_paths)
 
-    config_path = os.getcwd() + "/" + config_path
+    start = time.monotonic()
+    p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=WORKING_DIR)
+
+    out, err = p.communicate()
+    observe_subprocess("openeoct", start, p.returncode)
+    print(err)
+    if len(err) != 0:
+        return None, err
 
-    cmd = ['./openeoct', 'config', config_path]
+    if from_file:
+        return read_result(be_id), err
+    return parse_result(out), err
 
+
+def stream_openeoct(be_id, config_paths, on_event):
+    """
+    Executes the openeoct tool in stream mode (see the "--stream" flag), passing the state of every endpoint
+    to on_event as soon as it is validated. The results are taken from the final line of the stream, unless
+    RESULT_FROM_FILE is set, then they are read from the output file of the backend, which is written in stream
+    mode as well.
+
+    Parameters
+    ----------
+    be_id : int
+        ID of backend
+    config_paths : list
+        Paths of the config files
+    on_event : function
+        Called with the event dictionary of every validated endpoint
+
+    Return
+    ----------
+    result : dict
+        Validation results, None if there are no results.
+    err : bytes
+        Stderr of the openeoct process, empty if successful.
+    """
+    cmd = ['./openeoct', '--stream', 'config']
+    cmd.extend(config_paths)
+
+    start = time.monotonic()
     p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=WORKING_DIR)
 
-    out, err = p.communicate()
+    # stderr is read in the background, so that a full stderr pipe can not block the process
+    err_chunks = []
+    err_reader = threading.Thread(target=lambda: err_chunks.append(p.stderr.read()))
+    err_reader.start()
+
+    result = None
+    for line in p.stdout:
+        event = parse_result(line)
+        if not event:
+            continue
+        if event.get("event") == "result":
+            result = {"result": event["result"], "stats": event["stats"]}
+        else:
+            on_event(event)
+
+    p.wait()
+    observe_subprocess("openeoct", start, p.returncode)
+    err_reader.join()
+    err = b"".join(err_chunks)
     print(err)
+    if len(err) != 0:
+        return None, err
+
+    if app.config['RESULT_FROM_FILE']:
+        return read_result(be_id), err
+    return result, err
+
+
+def run_validation(be_id, on_event=None):
+    """
+    Run validation of backend. First prepares the backend and recreates the config file (see prepare_validation)
+    and then executes the configuration, or validates the backend in-process if VALIDATION_ENGINE is "python"
+    (see engine.py).
+
+    Parameters
+    ----------
+    be_id : int
+        ID of backend
+    on_event : function
+        If given and STREAM_RESULTS is set, called with the state of every endpoint as soon as it is validated
+    """
+    prepare_validation(be_id)
+
+    if app.config['VALIDATION_ENGINE'] == "python":
+        if not engine_available():
+            return ["The python validation engine requires the jsonschema package"]
+        try:
+            result = validate_backend(be_id, on_event=on_event if app.config['STREAM_RESULTS'] else None,
+                                      base_dir=WORKING_DIR)
+        except AuthenticationError as exp:
+            return [str(exp)]
+        if result and app.config['STORE_RESULTS']:
+            store_result(be_id, result)
+        return result
+
+    config_path = "config_{}.toml".format(str(be_id))
+
+    config_path = os.getcwd() + "/" + config_path
+
+    if on_event and app.config['STREAM_RESULTS']:
+        result, err = stream_openeoct(be_id, [config_path], on_event)
+    else:
+        result, err = execute_openeoct(be_id, [config_path])
     if len(err) != 0:
         return ["Error executing the openeoct command"]
 
-    return read_result(be_id)
+    if result and app.config['STORE_RESULTS']:
+        store_result(be_id, result)
+
+    return result
 
 
 def run_validation_deliverable(be_id):
@@ -229,16 +543,273 @@ def run_validation_deliverable(be_id):
     be_config_path = os.path.join(deliverable_path, "src", "openeo_d28", "D28_config_{}.toml".format(be_id))
     ep_config_path = os.path.join(deliverable_path, "src", "openeo_d28", "openeo_v1.0_endpoints.toml")
 
-    cmd = ['./openeoct', 'config', be_config_path, ep_config_path]
-
-    p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=WORKING_DIR)
-
-    out, err = p.communicate()
-    print(err)
+    result, err = execute_openeoct(be_id, [be_config_path, ep_config_path])
     if len(err) != 0:
         return str(err)
 
-    return read_result(be_id)
+    if result and app.config['STORE_RESULTS']:
+        store_result(be_id, result)
+
+    return result
+
+
+def parse_time(value):
+    """
+    Parses a timestamp of the openeoct results ("2006-01-02 15:04:05"), None if it is not valid.
+    """
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_int(value):
+    """
+    Parses a number of the openeoct results, which are given as strings, None if it is not valid.
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def store_result(be_id, result):
+    """
+    Stores the results of a validation in the database, as a ValidationRun with a GroupResult per group and an
+    EndpointResult per endpoint.
+
+    Parameters
+    ----------
+    be_id : int
+        ID of backend
+    result : dict
+        Validation results in the format of the openeoct tool
+
+    Return
+    ----------
+    run : ValidationRun
+        The stored run.
+    """
+    stats = result.get("stats", {})
+    execution = stats.get("execution", {})
+    groups = result.get("result", {})
+
+    state = "Valid"
+    if any(group.get("group_summary") == "Invalid" for group in groups.values()):
+        state = "Invalid"
+
+    run = ValidationRun(int(be_id), started=parse_time(execution.get("start")) or datetime.now(),
+                        finished=parse_time(execution.get("end")), state=state, stats=json.dumps(stats))
+    db.session.add(run)
+    db.session.flush()
+
+    rows = []
+    for gr_name, group in groups.items():
+        rows.append(GroupResult(run.id, gr_name, group.get("group_summary")))
+        for ep_id, ep_value in group.get("endpoints", {}).items():
+            rows.append(EndpointResult(run.id, gr_name, ep_id, url=ep_value.get("url"), type=ep_value.get("type"),
+                                       state=ep_value.get("state"), message=ep_value.get("message"),
+                                       duration_ms=parse_int(ep_value.get("duration_ms")),
+                                       size=parse_int(ep_value.get("size")),
+                                       retries=parse_int(ep_value.get("retries"))))
+    db.session.bulk_save_objects(rows)
+    db.session.commit()
+
+    return run
+
+
+def diff_runs(run_a, run_b):
+    """
+    Compares the endpoint states of two validation runs.
+
+    Parameters
+    ----------
+    run_a : int
+        ID of the earlier run
+    run_b : int
+        ID of the later run
+
+    Return
+    ----------
+    changes : list
+        Dictionaries with group, endpoint and the states "before" and "after" of every endpoint whose state differs,
+        the state is None if the endpoint is missing in one of the runs.
+    """
+    states_a = {(ep.group, ep.endpoint): ep.state for ep in EndpointResult.query.filter(EndpointResult.run == run_a)}
+    states_b = {(ep.group, ep.endpoint): ep.state for ep in EndpointResult.query.filter(EndpointResult.run == run_b)}
+
+    changes = []
+    for key in sorted(set(states_a) | set(states_b), key=lambda k: (str(k[0]), k[1])):
+        before = states_a.get(key)
+        after = states_b.get(key)
+        if before != after:
+            changes.append({"group": key[0], "endpoint": key[1], "before": before, "after": after})
+    return changes
+
+
+def iter_result_rows(be_id=None, chunk_rows=10000):
+    """
+    Streams the stored endpoint results as rows (see openeoct/export_results.py), loaded from the database
+    in chunks of chunk_rows rows.
+
+    Parameters
+    ----------
+    be_id : int
+        ID of backend, all backends if None
+
+    Return
+    ----------
+    rows : generator
+        Dictionaries with run, backend, started, group, endpoint, type, url, state, message, duration_ms, size
+        and retries.
+    """
+    query = db.session.query(ValidationRun.id, Backend.name, ValidationRun.started, EndpointResult.group,
+                             EndpointResult.endpoint, EndpointResult.type, EndpointResult.url,
+                             EndpointResult.state, EndpointResult.message, EndpointResult.duration_ms,
+                             EndpointResult.size, EndpointResult.retries).\
+        join(EndpointResult, EndpointResult.run == ValidationRun.id).\
+        join(Backend, Backend.id == ValidationRun.backend)
+    if be_id:
+        query = query.filter(ValidationRun.backend == be_id)
+
+    for run, backend, started, group, endpoint, type, url, state, message, duration_ms, size, retries in \
+            query.order_by(ValidationRun.id).yield_per(chunk_rows):
+        yield {
+            "run": str(run),
+            "backend": backend,
+            "started": started.strftime("%Y-%m-%d %H:%M:%S") if started else None,
+            "group": group,
+            "endpoint": endpoint,
+            "type": type,
+            "url": url,
+            "state": state,
+            "message": message,
+            "duration_ms": duration_ms,
+            "size": size,
+            "retries": retries
+        }
+
+
+BACKEND_SORTS = {"name": Backend.name, "url": Backend.url, "id": Backend.id}
+ENDPOINT_SORTS = {"backend": Backend.name, "group": Endpoint.group, "id": Endpoint.id, "url": Endpoint.url,
+                  "type": Endpoint.type, "state": EndpointResult.state}
+
+
+def query_backends(name=None, sort="name", desc=False):
+    """
+    Returns the query of the backends, filtered and sorted.
+
+    Parameters
+    ----------
+    name : str
+        Only backends whose name contains this string
+    sort : str
+        Key of BACKEND_SORTS
+    desc : bool
+        Sort descending
+
+    Return
+    ----------
+    query : Query
+        Query of the Backend instances.
+    """
+    query = Backend.query
+    if name:
+        query = query.filter(Backend.name.contains(name))
+    column = BACKEND_SORTS.get(sort, Backend.name)
+    return query.order_by(column.desc() if desc else column.asc(), Backend.id)
+
+
+def query_endpoints(be_id=None, group=None, type=None, state=None, sort="backend", desc=False):
+    """
+    Returns the query of the endpoints with the name of their backend and their state in the last stored
+    validation run of the backend, filtered and sorted.
+
+    Parameters
+    ----------
+    be_id : int
+        Only endpoints of this backend
+    group : str
+        Only endpoints of this group
+    type : str
+        Only endpoints with this request type
+    state : str
+        Only endpoints with this state in the last validation run
+    sort : str
+        Key of ENDPOINT_SORTS
+    desc : bool
+        Sort descending
+
+    Return
+    ----------
+    query : Query
+        Query of (Endpoint, backend name, last state) tuples, the state is None if the endpoint was not validated.
+    """
+    last_runs = db.session.query(ValidationRun.backend.label("backend"), func.max(ValidationRun.id).label("run")).\
+        group_by(ValidationRun.backend).subquery()
+
+    query = db.session.query(Endpoint, Backend.name, EndpointResult.state).\
+        join(Backend, Backend.id == Endpoint.backend).\
+        outerjoin(last_runs, last_runs.c.backend == Endpoint.backend).\
+        outerjoin(EndpointResult, and_(EndpointResult.run == last_runs.c.run, EndpointResult.endpoint == Endpoint.id,
+                                       EndpointResult.group == Endpoint.group))
+    if be_id:
+        query = query.filter(Endpoint.backend == be_id)
+    if group:
+        query = query.filter(Endpoint.group == group)
+    if type:
+        query = query.filter(Endpoint.type == type.upper())
+    if state:
+        query = query.filter(EndpointResult.state == state)
+
+    column = ENDPOINT_SORTS.get(sort, Backend.name)
+    return query.order_by(column.desc() if desc else column.asc(), Endpoint.backend, Endpoint.group, Endpoint.id)
+
+
+def endpoint_row(endpoint, backend_name, state):
+    """
+    Returns a row of query_endpoints as dictionary, as used by the JSON API of the endpoint list.
+    """
+    return {
+        "backend": endpoint.backend,
+        "backend_name": backend_name,
+        "id": endpoint.id,
+        "group": endpoint.group,
+        "url": endpoint.url,
+        "type": endpoint.type,
+        "state": state
+    }
+
+
+def get_regressions(since):
+    """
+    Finds the endpoints that were valid in the last run of each backend before the given time, but are not valid
+    in its latest run.
+
+    Parameters
+    ----------
+    since : datetime
+        Time of the baseline runs
+
+    Return
+    ----------
+    regressions : list
+        Dictionaries with backend name and id, baseline and latest run id, group, endpoint and the states
+        "before" and "after".
+    """
+    regressions = []
+    for backend in Backend.query.order_by(Backend.name).all():
+        runs = ValidationRun.query.filter(ValidationRun.backend == backend.id)
+        latest = runs.order_by(ValidationRun.started.desc()).first()
+        baseline = runs.filter(ValidationRun.started <= since).order_by(ValidationRun.started.desc()).first()
+        if not latest or not baseline or latest.id == baseline.id:
+            continue
+        for change in diff_runs(baseline.id, latest.id):
+            if change["before"] == "Valid" and change["after"] and change["after"] != "Valid":
+                change.update({"backend": backend.name, "be_id": backend.id, "baseline": baseline.id,
+                               "latest": latest.id})
+                regressions.append(change)
+    return regressions
 
 
 def run_pytest_validation(be_id):
@@ -251,11 +822,13 @@ def run_pytest_validation(be_id):
     cmd = "{} --backend {} " \
           "--html report_{}.html --api-version {}".format(PYTEST_CMD, backend.get_url(), be_id, api_version)
     #print(cmd)
+    start = time.monotonic()
     p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=PYTEST_DIR, shell=True)
     #py.test.cmdline.main(["--backend {}".format(backend.url), "--html report_{}.html".format(be_id)])
     #pytest.main()
 
     out, err = p.communicate()
+    observe_subprocess("pytest", start, p.returncode)
     print("Error: {}".format(err))
     print("Output: {}".format(out))
     if len(err) != 0:
@@ -283,44 +856,227 @@ def get_pytest_static_path(be_id):
     return result_path
 
 
+# seconds a body file is protected from removal after it was stored, in case it is referenced again meanwhile
+BODY_RELEASE_GRACE = 60
+CONTENT_NAME = re.compile(r"^[0-9a-f]{64}$")
+
+
+class Bodies(Mapping):
+    """
+    Read-only mapping of the body names to the bodies, listing the directory and reading the files on access.
+    """
+
+    def __init__(self, body_handler):
+        self.body_handler = body_handler
+
+    def __getitem__(self, name):
+        if not os.path.isfile(os.path.join(self.body_handler.basedir, name)):
+            raise KeyError(name)
+        return self.body_handler.read_body(name)
+
+    def __iter__(self):
+        return self.body_handler.iter_body_files()
+
+    def __len__(self):
+        return sum(1 for _ in self.body_handler.iter_body_files())
+
+
 class BodyHandler:
     """
-    Result class that contains all information related to an result of an validation.
+    Store of the request bodies of the endpoints in BODY_PATH. Bodies are stored content addressed: the file name is
+    the SHA-256 of the body, so that identical bodies of several endpoints and backends share one file. A file is
+    removed when the last endpoint referencing it is deleted or changed (see track_released_bodies), and recently
+    read bodies are kept in body_cache. Files with other names, e.g. "body_<backend>_<endpoint>" of older versions,
+    can still be read and written.
     """
     basedir = app.config['BODY_PATH']
 
+    @staticmethod
+    def is_content_name(name):
+        return bool(name) and CONTENT_NAME.match(name) is not None
+
     def load_bodies(self):
-        bodies = {}
-        body_files = self.get_bodies_files()
+        return Bodies(self)
 
-        for b_file in body_files:
-            bodies[b_file] = self.read_body(b_file)
-        return bodies
+    def iter_body_files(self):
+        if not os.path.isdir(self.basedir):
+            return
+        with os.scandir(self.basedir) as entries:
+            for entry in entries:
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    yield entry.name
 
     def get_bodies_files(self):
-        return [f for f in os.listdir(self.basedir) if os.path.isfile(os.path.join(self.basedir, f))]
+        return list(self.iter_body_files())
 
     def read_body(self, name):
+        content_name = self.is_content_name(name)
+        if content_name:
+            hit, value = body_cache.get(name)
+            if hit:
+                return value
         try:
-            with open(os.path.join(self.basedir, name)) as file:
+            with open(os.path.join(self.basedir, name), newline="" if content_name else None,
+                      encoding="utf-8" if content_name else None) as file:
                 value = file.read()
                 file.close()
-            return value
         except:
             return "Body file not found!"
+        if content_name:
+            body_cache.set(name, value)
+        return value
+
+    def store_body(self, value):
+        """
+        Stores a body under its content address, the file is only written if there is no identical body yet.
+
+        Parameters
+        ----------
+        value : str
+            The body
+
+        Return
+        ----------
+        name : str
+            Name of the body file, i.e. the SHA-256 of the body.
+        """
+        name = hashlib.sha256(value.encode("utf-8")).hexdigest()
+        file_path = os.path.join(self.basedir, name)
+        if os.path.isfile(file_path):
+            # marks the body as used again, see BODY_RELEASE_GRACE
+            os.utime(file_path)
+        else:
+            os.makedirs(self.basedir, exist_ok=True)
+            tmp_path = "{}.{}.tmp".format(file_path, threading.get_ident())
+            with open(tmp_path, "w", newline="", encoding="utf-8") as file:
+                file.write(value)
+            os.replace(tmp_path, file_path)
+        body_cache.set(name, value)
+        return name
 
     def write_body(self, value, name=None):
+        """
+        Writes a body, content addressed (see store_body) if no name is given.
+
+        Return
+        ----------
+        name : str
+            Name of the body file.
+        """
         if not name:
-            name = uuid.uuid4().hex[:6].upper()
+            return self.store_body(value)
         f = open(os.path.join(self.basedir, name), "w")
         f.write(value)
         f.close()
+        body_cache.invalidate(name)
+        return name
 
-    def transfer_body(self, orig_file, name):
+    def transfer_body(self, orig_file, name=None):
         with open(orig_file) as file:
             value = file.read()
             file.close()
-        self.write_body(value, name=name)
+        return self.write_body(value, name=name)
+
+    def remove_bodies(self, names):
+        """
+        Removes content addressed body files, except for the ones stored within the last BODY_RELEASE_GRACE seconds.
+
+        Return
+        ----------
+        removed : int
+            Number of removed files.
+        """
+        removed = 0
+        for name in names:
+            if not self.is_content_name(name):
+                continue
+            body_cache.invalidate(name)
+            file_path = os.path.join(self.basedir, name)
+            try:
+                if time.time() - os.path.getmtime(file_path) < BODY_RELEASE_GRACE:
+                    continue
+                os.remove(file_path)
+                removed += 1
+            except OSError:
+                continue
+        return removed
+
+    def collect_garbage(self):
+        """
+        Removes the content addressed body files that no endpoint references, e.g. after bulk deletes.
+
+        Return
+        ----------
+        removed : int
+            Number of removed files.
+        """
+        referenced = {row.body for row in db.session.query(Endpoint.body).filter(Endpoint.body.isnot(None)).distinct()}
+        return self.remove_bodies([name for name in self.iter_body_files()
+                                   if self.is_content_name(name) and name not in referenced])
+
+    def migrate(self):
+        """
+        Converts the bodies of the endpoints with legacy names in BODY_PATH to content addressed bodies and removes the
+        legacy files that are no longer referenced.
+
+        Return
+        ----------
+        migrated : int
+            Number of migrated endpoints.
+        """
+        migrated = 0
+        legacy_names = set()
+        for endpoint in Endpoint.query.filter(Endpoint.body.isnot(None)):
+            if self.is_content_name(endpoint.body) or os.path.isabs(endpoint.body):
+                continue
+            file_path = os.path.join(self.basedir, endpoint.body)
+            if not os.path.isfile(file_path):
+                continue
+            with open(file_path) as file:
+                value = file.read()
+            legacy_names.add(endpoint.body)
+            endpoint.body = self.store_body(value)
+            migrated += 1
+        db.session.commit()
+
+        referenced = {row.body for row in db.session.query(Endpoint.body).filter(Endpoint.body.in_(legacy_names))}
+        for name in legacy_names - referenced:
+            os.remove(os.path.join(self.basedir, name))
+        return migrated
 
     def get_abs_path(self, name):
-        return os.path.join(os.getcwd(), self.basedir, name)
\ No newline at end of file
+        return os.path.join(os.getcwd(), self.basedir, name)
+
+
+@event.listens_for(db.session, "after_flush")
+def track_released_bodies(session, flush_context):
+    """
+    Collects the content addressed bodies that are no longer referenced by any endpoint after this flush, because
+    the endpoints referencing them were deleted or got another body. They are removed after the commit.
+    """
+    names = set()
+    for obj in session.deleted:
+        if isinstance(obj, Endpoint) and BodyHandler.is_content_name(obj.body):
+            names.add(obj.body)
+    for obj in session.dirty:
+        if isinstance(obj, Endpoint):
+            names.update(name for name in inspect(obj).attrs.body.history.deleted or ()
+                         if BodyHandler.is_content_name(name))
+    if not names:
+        return
+
+    with session.no_autoflush:
+        referenced = {row.body for row in session.query(Endpoint.body).filter(Endpoint.body.in_(names))}
+    session.info.setdefault("released_bodies", set()).update(names - referenced)
+
+
+@event.listens_for(db.session, "after_commit")
+def remove_released_bodies(session):
+    names = session.info.pop("released_bodies", None)
+    if names:
+        BodyHandler().remove_bodies(names)
+
+
+@event.listens_for(db.session, "after_rollback")
+def keep_released_bodies(session):
+    session.info.pop("released_bodies", None)
\ No newline at end of file
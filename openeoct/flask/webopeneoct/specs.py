@@ -0,0 +1,250 @@
+"""
+Registry of the OpenAPI specifications of the backends. Remote specifications are mirrored into SPEC_PATH, so that
+the validators read a local file, and revalidated with conditional requests (ETag/Last-Modified) at most every
+SPEC_REVALIDATE seconds. An index of the paths, methods and responses of every specification is kept in memory.
+Only the validation jobs and the CLI download specifications, request handlers read the local mirror and schedule a
+background download if there is none yet (see mirror_later).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+
+from ..webopeneoct import app
+from .httpclient import http_client
+
+
+def is_remote(location):
+    return urlparse(location or "").scheme in ("http", "https")
+
+
+def read_spec_file(file_path):
+    """
+    Reads a specification file, as YAML if it has a YAML extension (requires PyYAML), otherwise as JSON.
+    """
+    with open(file_path) as spec_file:
+        text = spec_file.read()
+    if file_path.endswith((".yaml", ".yml")):
+        import yaml
+        return yaml.safe_load(text)
+    return json.loads(text)
+
+
+class SpecIndex:
+    """
+    Index of the paths of a specification.
+
+    Attributes
+    ----------
+    paths : dict
+        path -> {method (upper case) -> {"summary": str, "responses": {status: [media types]}}}, e.g.
+        "/jobs/{job_id}" -> {"GET": {"summary": "Full metadata for a batch job", "responses": {"200": [...]}}}
+    """
+
+    def __init__(self, spec):
+        self.paths = {}
+        for path, path_item in (spec.get("paths") or {}).items():
+            methods = {}
+            for method, operation in path_item.items():
+                if not isinstance(operation, dict) or method.startswith("x-") or method in ("parameters", "$ref"):
+                    continue
+                responses = {}
+                for status, response in (operation.get("responses") or {}).items():
+                    responses[str(status)] = sorted((response.get("content") or {}).keys()) \
+                        if isinstance(response, dict) else []
+                methods[method.upper()] = {"summary": operation.get("summary", ""), "responses": responses}
+            self.paths[path] = methods
+
+    def to_json(self):
+        """
+        Returns the paths ordered by path as list of {"path": path, "methods": [...], "summary": str}.
+        """
+        return [{"path": path, "methods": sorted(methods),
+                 "summary": next((op["summary"] for op in methods.values() if op["summary"]), "")}
+                for path, methods in sorted(self.paths.items())]
+
+
+class SpecRegistry:
+    """
+    Mirrors the remote specifications into a local directory and indexes them, thread safe.
+    For every mirrored specification there is a "<name>.meta.json" file with its URL, ETag, Last-Modified and the
+    time it was last checked.
+
+    Parameters
+    ----------
+    directory : str
+        Directory of the mirrored specifications
+    revalidate : int
+        Seconds a mirrored specification is used before it is checked for changes
+    """
+
+    def __init__(self, directory, revalidate):
+        self.directory = directory
+        self.revalidate = revalidate
+        self.indexes = {}
+        self.locks = {}
+        self.pending = set()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spec-mirror")
+        self.lock = threading.Lock()
+
+    def mirror_paths(self, url):
+        """
+        Returns the paths of the mirrored file and of its meta file, the name is the hash of the URL with the
+        extension of the URL, so that YAML specifications stay recognizable.
+        """
+        extension = os.path.splitext(urlparse(url).path)[1].lower()
+        if extension not in (".json", ".yaml", ".yml"):
+            extension = ".json"
+        name = hashlib.sha256(url.encode("utf-8")).hexdigest()[:24]
+        file_path = os.path.abspath(os.path.join(self.directory, name + extension))
+        return file_path, file_path + ".meta.json"
+
+    def local_path(self, location, base_dir=".", fetch=True):
+        """
+        Returns the local file of a specification: the mirror of a remote specification, or the absolute path
+        of a local file (relative to base_dir).
+
+        Parameters
+        ----------
+        location : str
+            URL or path of the specification
+        base_dir : str
+            Directory relative paths are resolved against
+        fetch : bool
+            If False, the existing mirror is returned without any request, i.e. neither downloaded nor revalidated
+
+        Return
+        ----------
+        file_path : str
+            Path of the file, None if there is no such file or the remote specification could not be mirrored.
+        """
+        if not location:
+            return None
+        if is_remote(location):
+            if not fetch:
+                file_path = self.mirror_paths(location)[0]
+                return file_path if os.path.isfile(file_path) else None
+            return self.mirror(location)
+        file_path = os.path.abspath(os.path.join(base_dir, location))
+        return file_path if os.path.isfile(file_path) else None
+
+    def mirror(self, url):
+        """
+        Downloads a remote specification, or revalidates the mirrored copy if it was checked more than
+        revalidate seconds ago. If the backend of the specification is not reachable, the mirrored copy is used.
+
+        Return
+        ----------
+        file_path : str
+            Path of the mirrored file, None if there is none.
+        """
+        file_path, meta_path = self.mirror_paths(url)
+        with self.lock:
+            lock = self.locks.setdefault(url, threading.Lock())
+
+        with lock:
+            meta = {}
+            if os.path.isfile(file_path) and os.path.isfile(meta_path):
+                try:
+                    with open(meta_path) as meta_file:
+                        meta = json.load(meta_file)
+                except ValueError:
+                    meta = {}
+            if meta and time.time() - meta.get("checked", 0) < self.revalidate:
+                return file_path
+
+            headers = {}
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+            try:
+                resp = http_client.get(url, headers=headers)
+            except requests.RequestException:
+                return file_path if meta else None
+
+            if resp.status_code == 200:
+                os.makedirs(self.directory, exist_ok=True)
+                tmp_path = "{}.{}.tmp".format(file_path, threading.get_ident())
+                with open(tmp_path, "wb") as spec_file:
+                    spec_file.write(resp.content)
+                os.replace(tmp_path, file_path)
+                meta = {"url": url, "etag": resp.headers.get("ETag"),
+                        "last_modified": resp.headers.get("Last-Modified"), "size": len(resp.content)}
+            elif resp.status_code != 304 or not meta:
+                return file_path if meta else None
+
+            meta["checked"] = time.time()
+            with open(meta_path, "w") as meta_file:
+                json.dump(meta, meta_file)
+            return file_path
+
+    def mirror_later(self, url):
+        """
+        Mirrors a remote specification in the background, e.g. if a request handler needs it but it is not mirrored
+        yet. Returns immediately, a specification is only scheduled once at a time.
+        """
+        with self.lock:
+            if url in self.pending:
+                return
+            self.pending.add(url)
+
+        def run():
+            try:
+                self.mirror(url)
+            finally:
+                with self.lock:
+                    self.pending.discard(url)
+
+        self.executor.submit(run)
+
+    def get_index(self, location, base_dir=".", fetch=True):
+        """
+        Returns the SpecIndex of a specification, built once per version of the local file.
+        If fetch is False, only an existing mirror of a remote specification is read (see local_path).
+
+        Return
+        ----------
+        index : SpecIndex
+            Index of the specification, None if it is not available or can not be read.
+        """
+        file_path = self.local_path(location, base_dir, fetch=fetch)
+        if not file_path:
+            return None
+        mtime = os.path.getmtime(file_path)
+        with self.lock:
+            entry = self.indexes.get(file_path)
+        if entry and entry[0] == mtime:
+            return entry[1]
+
+        try:
+            index = SpecIndex(read_spec_file(file_path))
+        except (OSError, ValueError, ImportError, AttributeError):
+            return None
+        with self.lock:
+            self.indexes[file_path] = (mtime, index)
+        return index
+
+    def entries(self):
+        """
+        Returns the meta data of all mirrored specifications.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith(".meta.json"):
+                try:
+                    with open(os.path.join(self.directory, name)) as meta_file:
+                        entries.append(dict(json.load(meta_file), file=name[:-len(".meta.json")]))
+                except (OSError, ValueError):
+                    continue
+        return entries
+
+
+spec_registry = SpecRegistry(app.config['SPEC_PATH'], app.config['SPEC_REVALIDATE'])
@@ -1,22 +1,131 @@
 
 from openeoct.flask.webopeneoct import app, db
-from flask import request, flash, redirect, url_for, render_template, send_file
+from flask import request, flash, redirect, url_for, render_template, send_file, jsonify, abort, Response, \
+    stream_with_context
 from .forms import BackendForm, EndpointForm, VariableForm
-from .models import Backend, Endpoint, Variable
+from .models import Backend, Endpoint, Variable, ValidationRun, CapabilitiesSnapshot, BackendHealth
+from sqlalchemy.orm import selectinload
 from .service import run_validation, create_configfile, run_pytest_validation, gen_endpoints, \
-    configs_to_backend, read_configfile, BodyHandler, read_file, write_configfile, write_file, run_validation_deliverable
+    configs_to_backend, read_configfile, read_file, write_configfile, write_file, run_validation_deliverable
+from .service import get_host, diff_runs, get_regressions, diff_capabilities, WORKING_DIR
+from .service import query_backends, query_endpoints, endpoint_row, BACKEND_SORTS, ENDPOINT_SORTS
+from .jobs import validation_queue, validate_all
+from .specs import spec_registry, is_remote
+from .health import health_prober
+from .httpclient import http_client
+from .metrics import metrics
+from .profiling import profile_store, has_profile_token
+from openeoct.json2html import timing_summary, TIMING_PERCENTILES
 import os
+import json
+from datetime import datetime, timedelta
 from werkzeug import secure_filename
 
 
+@app.template_filter('timing_summary')
+def timing_summary_filter(endpoints):
+    """
+    Summarizes the request durations of the endpoints of a result group, as rendered on the validation page.
+
+    Parameters
+    ----------
+    endpoints : dict
+        Endpoints of the group in the result format of the openeoct tool
+
+    Return
+    ----------
+    timing : list
+        (label, milliseconds) tuples of the percentiles and the maximum, empty if no request was timed.
+    """
+    summary = timing_summary(ep.get("duration_ms") for ep in endpoints.values())
+    if not summary["count"]:
+        return []
+    return [("p{}".format(q), summary["p{}".format(q)]) for q in TIMING_PERCENTILES] + [("max", summary["max"])]
+
+
+def get_page_args():
+    """
+    Returns page and rows per page of the list pages from the query parameters ("page" and "per_page").
+    """
+    page = max(1, request.args.get("page", 1, type=int))
+    per_page = request.args.get("per_page", app.config['PAGE_SIZE'], type=int)
+    return page, max(1, min(per_page, app.config['PAGE_SIZE_MAX']))
+
+
+def page_json(pagination, items):
+    return {
+        "items": items,
+        "page": pagination.page,
+        "per_page": pagination.per_page,
+        "pages": pagination.pages,
+        "total": pagination.total
+    }
+
+
+@app.template_global()
+def page_url(page):
+    """
+    Returns the URL of the current list page with the same filters, but another page.
+    """
+    args = request.args.to_dict()
+    args["page"] = page
+    return url_for(request.endpoint, **dict(request.view_args, **args))
+
+
 @app.route('/')
 def home():
     """
-    Home - Site of openeoct, listing the backends and linking to the validation and edit pages.
+    Home - Site of openeoct, listing the backends page by page and linking to the validation and edit pages.
+    The backends can be filtered by name ("name") and sorted ("sort", "order").
     """
-    backends = Backend.query.all()
+    page, per_page = get_page_args()
+    pagination = query_backends(name=request.args.get("name"), sort=request.args.get("sort", "name"),
+                                desc=request.args.get("order") == "desc").paginate(page, per_page, error_out=False)
+
+    # latest probes of the background health prober, the page never waits for the backends
+    be_ids = [backend.id for backend in pagination.items]
+    health = {row.backend: row for row in BackendHealth.query.filter(BackendHealth.backend.in_(be_ids))} \
+        if be_ids else {}
 
-    return render_template('home.html', backends=backends)
+    return render_template('home.html', backends=pagination.items, pagination=pagination, sorts=BACKEND_SORTS,
+                           health=health)
+
+
+@app.route('/api/health')
+def api_health():
+    """
+    Returns the latest health probe of every backend as JSON.
+    """
+    return jsonify({"interval": app.config['HEALTH_INTERVAL'], "duration": health_prober.last_duration,
+                    "backends": [health.to_json() for health in BackendHealth.query.order_by(BackendHealth.backend)]})
+
+
+@app.route('/health/refresh')
+def health_refresh():
+    """
+    Lets the background health prober probe all backends now and returns to the home page.
+    """
+    if app.config['HEALTH_PROBE']:
+        health_prober.start()
+        health_prober.refresh()
+        flash("The backends are probed, reload the page in a few seconds.")
+    else:
+        flash("The health probes are disabled (HEALTH_PROBE).")
+    return redirect(url_for('home'))
+
+
+@app.route('/api/backends')
+def api_backends():
+    """
+    Returns a page of the backends as JSON, same query parameters as the home page.
+    """
+    page, per_page = get_page_args()
+    pagination = query_backends(name=request.args.get("name"), sort=request.args.get("sort", "name"),
+                                desc=request.args.get("order") == "desc").paginate(page, per_page, error_out=False)
+
+    return jsonify(page_json(pagination, [{"id": backend.id, "name": backend.name, "url": backend.url,
+                                           "version": backend.version, "openapi": backend.openapi}
+                                          for backend in pagination.items]))
 
 
 @app.route('/backend/edit/<be_id>', methods=['GET', 'POST'])
@@ -46,23 +155,29 @@ def backend_edit(be_id):
         #create_configfile(be_id)
 
         return redirect(request.referrer)
-    else:
-        if be_id:
-            backend = Backend.query.filter(Backend.id == be_id).first()
-            if backend:
-                form.set_backend(backend)
 
     endpoints = None
-    if be_id:
-        endpoints = Endpoint.query.filter(Endpoint.backend == be_id).all()
-
     variables = None
-    if be_id:
-        variables = Variable.query.filter(Variable.backend == be_id).all()
+    backend = get_backend_detail(be_id)
+    if backend:
+        form.set_backend(backend)
+        endpoints = backend.endpoints
+        variables = backend.variables
 
     return render_template('backend_edit.html', form=form, endpoints=endpoints, variables=variables)
 
 
+def get_backend_detail(be_id):
+    """
+    Returns the backend with its endpoints and variables, loaded with one query each instead of one per
+    relation access, None if be_id is not given or there is no such backend.
+    """
+    if not be_id:
+        return None
+    return Backend.query.options(selectinload(Backend.endpoints), selectinload(Backend.variables)). \
+        filter(Backend.id == be_id).first()
+
+
 @app.route('/backend/register/', methods=['GET', 'POST'])
 def backend_register():
     """
@@ -120,10 +235,10 @@ def backend_register_cfg(be_id=None):
             for file in file_paths:
                 config_json = read_configfile(file)
                 backend.append_config(config_json)
+                db.session.commit()
         else:
             configs_to_backend(file_paths=file_paths, name=name)
 
-        db.session.commit()
         if be_id:
             return redirect(request.referrer)
         else:
@@ -131,6 +246,21 @@ def backend_register_cfg(be_id=None):
     return render_template('backend_config_upload.html', name=name, warning_message=None)
 
 
+def flash_generated(added, skipped):
+    """
+    Reports the outcome of the endpoint generation on the next page, skipped is None if nothing changed.
+    """
+    if skipped is None:
+        flash("The capabilities of the backend did not change since the last generation.")
+        return
+    if added:
+        flash("Added {} endpoints: {}".format(len(added), ", ".join(ep.id for ep in added)))
+    else:
+        flash("No new endpoints found in the capabilities of the backend.")
+    if skipped:
+        flash("Skipped {} existing endpoints: {}".format(len(skipped), ", ".join(skipped)))
+
+
 @app.route('/backend/gen_get_endpoints/<be_id>', methods=['GET'])
 def backend_gen_get_endpoints(be_id):
     """
@@ -138,23 +268,21 @@ def backend_gen_get_endpoints(be_id):
     If an endpoint does already exists, it is not overwritten but ignored.
     """
     try:
-        gen_endpoints(be_id)
+        added, skipped = gen_endpoints(be_id)
     except:
-        if be_id:
-            form = BackendForm(request.form)
-            backend = Backend.query.filter(Backend.id == be_id).first()
-            if backend:
-                form.set_backend(backend)
+        form = BackendForm(request.form)
+        backend = get_backend_detail(be_id)
         endpoints = None
-        if be_id:
-            endpoints = Endpoint.query.filter(Endpoint.backend == be_id).all()
-
         variables = None
-        if be_id:
-            variables = Variable.query.filter(Variable.backend == be_id).all()
+        if backend:
+            form.set_backend(backend)
+            endpoints = backend.endpoints
+            variables = backend.variables
         return render_template('backend_edit.html', form=form, endpoints=endpoints, variables=variables,
                                warning_message="Could not create GET endpoints, maybe URL is not valid!")
 
+    flash_generated(added, skipped)
+
     return redirect(url_for('backend_edit', be_id=be_id))
 
 
@@ -165,23 +293,21 @@ def backend_gen_all_endpoints(be_id):
     If an endpoint does already exists, it is not overwritten but ignored.
     """
     try:
-        gen_endpoints(be_id, re_types=["GET", "POST", "PUT", "DELETE", "PATCH"], leave_ids=False)
+        added, skipped = gen_endpoints(be_id, re_types=["GET", "POST", "PUT", "DELETE", "PATCH"], leave_ids=False)
     except:
-        if be_id:
-            form = BackendForm(request.form)
-            backend = Backend.query.filter(Backend.id == be_id).first()
-            if backend:
-                form.set_backend(backend)
+        form = BackendForm(request.form)
+        backend = get_backend_detail(be_id)
         endpoints = None
-        if be_id:
-            endpoints = Endpoint.query.filter(Endpoint.backend == be_id).all()
-
         variables = None
-        if be_id:
-            variables = Variable.query.filter(Variable.backend == be_id).all()
+        if backend:
+            form.set_backend(backend)
+            endpoints = backend.endpoints
+            variables = backend.variables
         return render_template('backend_edit.html', form=form, endpoints=endpoints, variables=variables,
                                warning_message="Could not create ALL endpoints, maybe URL is not valid!")
 
+    flash_generated(added, skipped)
+
     return redirect(url_for('backend_edit', be_id=be_id))
 
 
@@ -199,19 +325,16 @@ def endpoint_register(ep_id=None):
     """
     form = EndpointForm(request.form)
     if request.method == 'POST' and form.validate():
-        body_handler = BodyHandler()
-
-        endpoint = form.get_endpoint()
         if 'file' in request.files:
             file = request.files['file']
             filename = secure_filename(file.filename)
             if filename:
                 full_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
                 file.save(full_path)
-                body_path = "body_{}_{}".format(str(endpoint.backend), ep_id)
-                body_handler.transfer_body(full_path, body_path)
-                form.body.data = body_handler.read_body(body_path)
+                form.body.data = read_file(full_path)
 
+        # the body is stored content addressed, see BodyHandler
+        endpoint = form.get_endpoint()
         orig_endpoint = Endpoint.query.filter(Endpoint.id == ep_id).first()
 
         if not orig_endpoint:
@@ -220,9 +343,6 @@ def endpoint_register(ep_id=None):
             orig_endpoint.set(endpoint)
             db.session.commit()
 
-        if len(form.body.data) != 0:
-            body_handler.write_body(value=form.body.data, name="body_{}_{}".format(str(endpoint.backend), ep_id))
-
         return redirect(request.referrer)
     else:
         if ep_id:
@@ -250,10 +370,6 @@ def backend_add_endpoint(be_id=None):
         endpoint = form.get_endpoint()
         db.session.add(endpoint)
 
-        if len(form.body.data) != 0:
-            body_handler = BodyHandler()
-            body_handler.write_body(value=form.body.data, name="body_{}_{}".format(str(endpoint.backend), endpoint.id))
-
         return redirect(request.referrer)
     else:
         form.backend.data = be_id
@@ -277,7 +393,10 @@ def backend_add_variable(be_id=None):
     if request.method == 'POST' and form.validate():
 
         variable = form.get_variable()
-        db.session.add(variable)
+        backend = Backend.query.filter(Backend.id == variable.backend).first()
+        # a variable with the same name is updated, like on config imports
+        if not backend or backend.append_variable(variable):
+            db.session.add(variable)
 
         #create_configfile(be_id)
 
@@ -494,19 +613,265 @@ def backend_validate(be_id):
     """
     backend = Backend.query.filter(Backend.id == be_id).first()
 
+    # the job prepares the backend, see run_validation
+    job = validation_queue.submit(be_id, run_validation, host=get_host(backend.get_url()))
+
+    return redirect(url_for('validation_job', job_id=job.id))
+
+
+@app.route('/backend/validate_all')
+def backend_validate_all():
+    """
+    Validates all backends in parallel, limited by the number of validation workers.
+    """
+    batch = validate_all(validation_queue)
+
+    return redirect(url_for('validation_batch', batch_id=batch.id))
+
+
+@app.route('/validation/batch/<batch_id>')
+def validation_batch(batch_id):
+    """
+    Shows the states of the validation jobs of a batch.
+
+    Parameters
+    ----------
+    batch_id : str
+        ID of validation batch
+    """
+    batch = validation_queue.get_batch(batch_id)
+    if not batch:
+        abort(404)
+
+    return render_template('validation_batch.html', batch=batch)
+
+
+@app.route('/validation/batch/<batch_id>/result')
+def validation_batch_result(batch_id):
+    """
+    Returns the aggregated validation results of all backends of a batch as JSON.
+
+    Parameters
+    ----------
+    batch_id : str
+        ID of validation batch
+    """
+    batch = validation_queue.get_batch(batch_id)
+    if not batch:
+        abort(404)
+    if not batch.done():
+        return jsonify(batch.to_json()), 202
+
+    return jsonify(batch.aggregate())
+
+
+@app.route('/validation/job/<job_id>')
+def validation_job(job_id):
+    """
+    Shows the state of a validation job and its results, once the job is finished.
+
+    Parameters
+    ----------
+    job_id : str
+        ID of validation job
+    """
+    job = validation_queue.get(job_id)
+    if not job:
+        abort(404)
+
+    backend = Backend.query.filter(Backend.id == job.be_id).first()
+
     form = BackendForm(request.form)
 
     form.set_backend(backend)
 
-    if backend.output == "result_None.json" or not backend.output:
-        backend.output = "result_{}.json".format(backend.id)
-        db.session.commit()
+    return render_template('backend_validate.html', form=form, job=job, results=job.result or {})
 
-    create_configfile(be_id=be_id)
 
-    results = run_validation(be_id)
+@app.route('/validation/job/<job_id>/status')
+def validation_job_status(job_id):
+    """
+    Returns the state of a validation job as JSON, used by the validation page to poll for the results.
 
-    return render_template('backend_validate.html', form=form, results=results)
+    Parameters
+    ----------
+    job_id : str
+        ID of validation job
+    """
+    job = validation_queue.get(job_id)
+    if not job:
+        abort(404)
+
+    return jsonify(job.to_json())
+
+
+@app.route('/validation/job/<job_id>/events')
+def validation_job_events(job_id):
+    """
+    Streams the states of the validated endpoints of a job as server-sent events, followed by a "done" event
+    as soon as the job is finished.
+
+    Parameters
+    ----------
+    job_id : str
+        ID of validation job
+    """
+    job = validation_queue.get(job_id)
+    if not job:
+        abort(404)
+
+    def generate():
+        index = 0
+        while True:
+            events = job.wait_events(index, timeout=15)
+            for event in events:
+                yield "event: endpoint\ndata: {}\n\n".format(json.dumps(event))
+            index += len(events)
+            if job.done() and index >= len(job.events):
+                yield "event: done\ndata: {}\n\n".format(json.dumps(job.to_json()))
+                return
+            if not events:
+                # keeps the connection open while long running endpoints are validated
+                yield ": keep-alive\n\n"
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route('/validation/job/<job_id>/result')
+def validation_job_result(job_id):
+    """
+    Returns the validation result of a finished job as JSON.
+
+    Parameters
+    ----------
+    job_id : str
+        ID of validation job
+    """
+    job = validation_queue.get(job_id)
+    if not job:
+        abort(404)
+    if not job.done():
+        return jsonify(job.to_json()), 202
+
+    return jsonify(job.result or job.to_json())
+
+
+@app.route('/backend/runs/<be_id>')
+def backend_runs(be_id):
+    """
+    Lists the stored validation runs of a backend, newest first.
+
+    Parameters
+    ----------
+    be_id : int
+        ID of backend
+    """
+    backend = Backend.query.filter(Backend.id == be_id).first()
+    if not backend:
+        abort(404)
+
+    form = BackendForm(request.form)
+
+    form.set_backend(backend)
+
+    runs = ValidationRun.query.filter(ValidationRun.backend == be_id).order_by(ValidationRun.started.desc()).\
+        limit(app.config['RUN_LIST_LIMIT']).all()
+
+    return render_template('backend_runs.html', form=form, runs=runs)
+
+
+@app.route('/run/<run_id>')
+def run_show(run_id):
+    """
+    Shows the results of a stored validation run.
+
+    Parameters
+    ----------
+    run_id : int
+        ID of validation run
+    """
+    run = ValidationRun.query.filter(ValidationRun.id == run_id).first()
+    if not run:
+        abort(404)
+
+    backend = Backend.query.filter(Backend.id == run.backend).first()
+
+    form = BackendForm(request.form)
+
+    form.set_backend(backend)
+
+    return render_template('backend_validate.html', form=form, results=run.to_json())
+
+
+@app.route('/run/diff/<run_a>/<run_b>')
+def run_diff(run_a, run_b):
+    """
+    Shows the endpoints whose state differs between two validation runs.
+
+    Parameters
+    ----------
+    run_a : int
+        ID of the earlier validation run
+    run_b : int
+        ID of the later validation run
+    """
+    first = ValidationRun.query.filter(ValidationRun.id == run_a).first()
+    second = ValidationRun.query.filter(ValidationRun.id == run_b).first()
+    if not first or not second:
+        abort(404)
+
+    changes = diff_runs(first.id, second.id)
+
+    return render_template('run_diff.html', run_a=first, run_b=second, changes=changes)
+
+
+@app.route('/backend/capabilities/<be_id>')
+def backend_capabilities(be_id):
+    """
+    Shows the endpoints added to and removed from the capabilities of a backend, between a snapshot (query parameter
+    "snapshot", defaults to the latest one) and the snapshot before it, and lists the stored snapshots.
+
+    Parameters
+    ----------
+    be_id : int
+        ID of backend
+    """
+    backend = Backend.query.filter(Backend.id == be_id).first()
+    if not backend:
+        abort(404)
+
+    snapshots = CapabilitiesSnapshot.query.filter(CapabilitiesSnapshot.backend == backend.id). \
+        order_by(CapabilitiesSnapshot.id.desc()).all()
+    snapshot = snapshots[0] if snapshots else None
+    snapshot_id = request.args.get("snapshot", type=int)
+    if snapshot_id:
+        snapshot = next((snap for snap in snapshots if snap.id == snapshot_id), None)
+        if not snapshot:
+            abort(404)
+
+    previous = None
+    changes = None
+    if snapshot:
+        previous = next((snap for snap in snapshots if snap.id < snapshot.id), None)
+        changes = diff_capabilities(previous, snapshot)
+
+    return render_template('capabilities_diff.html', backend=backend, snapshots=snapshots, snapshot=snapshot,
+                           previous=previous, changes=changes)
+
+
+@app.route('/run/regressions')
+def run_regressions():
+    """
+    Lists the endpoints that were valid a given number of days ago (query parameter "days", defaults to 7),
+    but are not valid in the latest validation run of their backend.
+    """
+    days = request.args.get("days", 7, type=int)
+    since = datetime.now() - timedelta(days=days)
+
+    regressions = get_regressions(since)
+
+    return render_template('regressions.html', regressions=regressions, days=days)
 
 
 @app.route('/backend/download/<be_id>')
@@ -519,19 +884,17 @@ def backend_download(be_id):
     be_id : int
         ID of backend
     """
-    create_configfile(be_id=be_id, plainpwd=False)
-
     backend = Backend.query.filter(Backend.id == be_id).first()
 
     if backend.output == "result_None.json":
         backend.output = "result_{}.json".format(backend.id)
         db.session.commit()
 
-    config_path = "config_{}.toml".format(str(be_id))
+    config_path = create_configfile(be_id=be_id, plainpwd=False)
 
     config_path = os.getcwd() + "/" + config_path
 
-    return send_file(config_path, as_attachment=True)
+    return send_file(config_path, as_attachment=True, attachment_filename="config_{}.toml".format(str(be_id)))
 
 
 @app.route('/backend/validatepytest/<be_id>')
@@ -561,20 +924,126 @@ def backend_validate_pytest(be_id):
         return redirect(url_for('static', filename=result_path)) # return render_template('backend_validate_pytest.html', form=form, result_path=result_path)
 
 
+def get_endpoint_query(be_id=None):
+    """
+    Returns the query of the endpoint list with the filters and sorting of the query parameters.
+    """
+    return query_endpoints(be_id=be_id or request.args.get("backend", type=int),
+                           group=request.args.get("group"), type=request.args.get("type"),
+                           state=request.args.get("state"), sort=request.args.get("sort", "backend"),
+                           desc=request.args.get("order") == "desc")
+
+
 @app.route('/endpoint/list')
 @app.route('/endpoint/list/<be_id>')
 def endpoint_list(be_id=None):
     """
-    Lists all endpoints, if be_id is not None it will only list the endpoints related to the specific backend.
+    Lists the endpoints page by page, if be_id is not None it will only list the endpoints related to the specific
+    backend. The endpoints can be filtered by backend ("backend"), group ("group"), request type ("type") and
+    state in the last validation run ("state") and sorted ("sort", "order").
 
     Parameters
     ----------
     be_id : int
         ID of backend
     """
-    if not be_id:
-        endpoints = Endpoint.query.all()
+    page, per_page = get_page_args()
+    pagination = get_endpoint_query(be_id).paginate(page, per_page, error_out=False)
+    backends = db.session.query(Backend.id, Backend.name).order_by(Backend.name).all()
+
+    return render_template('endpoint_list.html', endpoints=pagination.items, pagination=pagination,
+                           backends=backends, sorts=ENDPOINT_SORTS, be_id=be_id)
+
+
+@app.route('/api/endpoints')
+@app.route('/api/endpoints/<be_id>')
+def api_endpoints(be_id=None):
+    """
+    Returns a page of the endpoints as JSON, same query parameters as the endpoint list, used by the endpoint list
+    to load the following pages.
+
+    Parameters
+    ----------
+    be_id : int
+        ID of backend
+    """
+    page, per_page = get_page_args()
+    pagination = get_endpoint_query(be_id).paginate(page, per_page, error_out=False)
+
+    return jsonify(page_json(pagination, [endpoint_row(*row) for row in pagination.items]))
+
+
+@app.route('/api/spec/paths')
+def api_spec_paths():
+    """
+    Returns the paths of the OpenAPI specification of a backend ("?backend=<id>") with their methods, from the
+    index of the spec registry. Used to auto-complete the URL of the endpoint form.
+    """
+    backend = Backend.query.filter(Backend.id == request.args.get("backend", type=int)).first()
+    if not backend:
+        abort(404)
+
+    # only the local mirror is read, a missing one is downloaded in the background
+    index = spec_registry.get_index(backend.openapi, base_dir=WORKING_DIR, fetch=False)
+    if not index:
+        pending = is_remote(backend.openapi)
+        if pending:
+            spec_registry.mirror_later(backend.openapi)
+        return jsonify({"openapi": backend.openapi, "paths": [], "pending": pending})
+    return jsonify({"openapi": backend.openapi, "paths": index.to_json(), "pending": False})
+
+
+@app.route('/api/specs')
+def api_specs():
+    """
+    Returns the remote OpenAPI specifications mirrored by the spec registry, with their ETag, Last-Modified and
+    the time they were last checked.
+    """
+    return jsonify(spec_registry.entries())
+
+
+@app.route('/http/stats')
+def http_stats():
+    """
+    Returns the counters (requests, errors, retries, bytes and latency) of the requests to the backends per host.
+    """
+    return jsonify(http_client.get_stats())
+
+
+@app.route('/metrics')
+def metrics_show():
+    """
+    Returns the metrics of the application in the Prometheus text format: duration of the views, of the openeoct
+    processes and of the database queries, the requests to the backends and the validation queue.
+    """
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route('/profiles')
+@app.route('/profiles/<profile_id>')
+def profiles_show(profile_id=None):
+    """
+    Lists the kept request profiles (see PROFILE_REQUESTS and PROFILE_TOKEN) with their top frames, SQL statements
+    and requests to the backends. The PROFILE_TOKEN has to be given as "?profile=<token>", without a configured
+    token the profiles are not shown at all.
+
+    Parameters
+    ----------
+    profile_id : str
+        ID of a profile, to show only this one
+    """
+    if not has_profile_token():
+        abort(403)
+
+    if profile_id:
+        profile = profile_store.get(profile_id)
+        if not profile:
+            abort(404)
+        profiles = [profile]
     else:
-        endpoints = Endpoint.query.filter(Endpoint.backend == be_id).all()
+        profiles = profile_store.list()
+
+    if request.args.get("format") == "json":
+        return jsonify([profile.to_json() for profile in profiles])
 
-    return render_template('endpoint_list.html', endpoints=endpoints)
\ No newline at end of file
+    return render_template('profiles.html', profiles=profiles, token=request.args.get("profile"))
@@ -3,19 +3,18 @@
 Simple no-dependencies script to convert openeoct JSON result file to a
 easier to read HTML report.
 """
-import sys
+import argparse
+import io
 import json
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
+BUFFER_SIZE = 1 << 20
+CHUNK_SIZE = 1 << 16
 
-def main(input_path=None, output_path=None):
-    input = open(input_path, "r") if input_path else sys.stdin
-    with input as f:
-        report = json.load(f)
-
-    output = open(output_path, "w") if output_path else sys.stdout
-    with output as f:
-        output.write("<!DOCTYPE html>\n<html>\n")
-        output.write("""<style>
+STYLE = """<style>
             body { font-size: 10pt; }
             table {  border-collapse: collapse; }
             table td { border: 1px solid #aaa; }
@@ -25,31 +24,347 @@ def main(input_path=None, output_path=None):
             .state-notsupported { background-color: #fed; color: #432; }
             .state-valid { background-color: #cfc; color: #040; }
             td.message { font-size: 80%; }
+            td.number { text-align: right; }
+            th { cursor: pointer; }
+            tfoot td { font-size: 80%; background-color: #eee; }
             </style>
-        """)
+            <script>
+            // sorts the rows of a table by the clicked column, numbers numerically
+            document.addEventListener("click", function(e) {
+                var th = e.target.closest("thead th");
+                if (!th) { return; }
+                var table = th.closest("table");
+                var body = table.tBodies[0];
+                var column = th.cellIndex;
+                var descending = th.dataset.sort != "asc";
+                th.dataset.sort = descending ? "asc" : "desc";
+                var rows = Array.prototype.slice.call(body.rows);
+                rows.sort(function(a, b) {
+                    var x = a.cells[column].textContent, y = b.cells[column].textContent;
+                    var order = (x === "" || y === "" || isNaN(x) || isNaN(y)) ? x.localeCompare(y) : x - y;
+                    return descending ? order : -order;
+                });
+                rows.forEach(function(row) { body.appendChild(row); });
+            });
+            </script>
+        """
+TIMING_PERCENTILES = [50, 90, 99]
+
+
+class JsonStreamReader:
+    """
+    Minimal incremental JSON reader: walks objects member by member and decodes
+    single values, reading the input in chunks instead of loading it at once.
+    """
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError("Expected {!r} at position {}".format(char, self.pos))
+        self.pos += 1
+
+    def value(self):
+        """
+        Decodes the next complete JSON value.
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # numbers and literals at the end of the buffer might continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except ValueError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def members(self):
+        """
+        Iterates over the keys of the next JSON object, the caller has to consume
+        the value of every key (with value or members) before the next iteration.
+        """
+        self._expect("{")
+        first = True
+        while True:
+            char = self._peek()
+            if char == "}":
+                self.pos += 1
+                return
+            if not first:
+                self._expect(",")
+            first = False
+            key = self.value()
+            self._expect(":")
+            yield key
+
+
+def render_stats(stats):
+    return "<dl>{ds}</dl>".format(ds="".join(
+        "<dt>{f}: {t}</dt><dd>{d}</dd>".format(f=f, t=k, d=v)
+        for f in ["backend", "spec"]
+        for k, v in stats.get(f, {}).items()
+    ))
+
+
+def render_group_header(group_name, group_summary):
+    return '<h1 class="state state-{s}">{g}: {s}</h1>\n<table>\n<thead><tr>{ths}</tr></thead>\n<tbody>\n'.format(
+        g=group_name, s=group_summary.lower(),
+        ths="".join("<th>{h}</th>".format(h=h) for h in
+                    ["name", "method", "url", "state", "ms", "bytes", "retries", "message"])
+    )
+
+
+def render_endpoint(endpoint_name, endpoint):
+    return '''<tr class="state state-{s}"><td>{n}</td><td><code>{m}</code></td><td><code>{u}</code></td>
+                    <td>{s}</td><td class="number">{d}</td><td class="number">{b}</td><td class="number">{r}</td>
+                    <td class="message">{g}</td></tr>
+                '''.format(
+        n=endpoint_name, m=endpoint["type"], u=endpoint["url"], s=endpoint["state"].lower(),
+        d=endpoint.get("duration_ms", ""), b=endpoint.get("size", ""), r=endpoint.get("retries", ""),
+        g=endpoint.get("message")
+    )
+
+
+def percentile(values, q):
+    """
+    Nearest-rank percentile q (0-100) of the sorted values, None if there are none.
+    """
+    if not values:
+        return None
+    return values[max(0, int(math.ceil(q / 100.0 * len(values))) - 1)]
+
+
+def timing_summary(durations):
+    """
+    Summarizes the request durations (in ms) of a group: count, the TIMING_PERCENTILES ("p50", ...) and max.
+    """
+    values = sorted(int(d) for d in durations if d not in (None, ""))
+    summary = {"count": len(values), "max": values[-1] if values else None}
+    for q in TIMING_PERCENTILES:
+        summary["p{}".format(q)] = percentile(values, q)
+    return summary
+
+
+def render_group_footer(durations):
+    summary = timing_summary(durations)
+    timing = ""
+    if summary["count"]:
+        timing = ", ".join("{k} {v} ms".format(k=k, v=summary[k])
+                           for k in ["p{}".format(q) for q in TIMING_PERCENTILES] + ["max"])
+    return '</tbody>\n<tfoot><tr><td colspan="8">{t}</td></tr></tfoot>\n</table>\n'.format(t=timing)
+
+
+def main(input_path=None, output_path=None):
+    input = open(input_path, "r") if input_path else sys.stdin
+    with input as f:
+        report = json.load(f)
+
+    output = open(output_path, "w") if output_path else sys.stdout
+    with output as f:
+        output.write("<!DOCTYPE html>\n<html>\n")
+        output.write(STYLE)
         output.write("<body>\n")
-        output.write("<dl>{ds}</dl>".format(ds="".join(
-            "<dt>{f}: {t}</dt><dd>{d}</dd>".format(f=f, t=k, d=v)
-            for f in ["backend", "spec"]
-            for k, v in report["stats"][f].items()
-        )))
+        output.write(render_stats(report["stats"]))
         for group_name, group in report["result"].items():
-            output.write('<h1 class="state state-{s}">{g}: {s}</h1>\n'.format(g=group_name, s=group["group_summary"].lower()))
-            output.write("<table>\n")
-            output.write("<thead><tr>{ths}</tr></thead>\n".format(
-                ths="".join("<th>{h}</th>".format(h=h) for h in ["name", "method", "url", "state", "message"])
-            ))
+            output.write(render_group_header(group_name, group["group_summary"]))
             for endpoint_name, endpoint in group["endpoints"].items():
-                output.write('''<tr class="state state-{s}"><td>{n}</td><td><code>{m}</code></td><td><code>{u}</code></td>
-                    <td>{s}</td><td class="message">{g}</td></tr>
-                '''.format(
-                    n=endpoint_name, m=endpoint["type"], u=endpoint["url"], s=endpoint["state"].lower(),
-                    g=endpoint.get("message")
-                ))
-            output.write("</table>\n")
+                output.write(render_endpoint(endpoint_name, endpoint))
+            output.write(render_group_footer(endpoint.get("duration_ms") for endpoint in group["endpoints"].values()))
 
         output.write("</body></html>\n")
 
 
+def main_stream(input_path=None, output_path=None):
+    """
+    Converts the report group by group and endpoint by endpoint, so only one group is held in memory.
+    As openeoct writes the stats after the results, they are at the end of the page.
+    """
+    input = open(input_path, "r") if input_path else sys.stdin
+    output = open(output_path, "w", buffering=BUFFER_SIZE) if output_path else sys.stdout
+    with input as f_in, output as f_out:
+        reader = JsonStreamReader(f_in)
+        f_out.write("<!DOCTYPE html>\n<html>\n")
+        f_out.write(STYLE)
+        f_out.write("<body>\n")
+        stats = None
+        for key in reader.members():
+            if key == "result":
+                for group_name in reader.members():
+                    # the summary may follow the endpoints, so the rows of one group are collected first
+                    rows = io.StringIO()
+                    group_summary = ""
+                    durations = []
+                    for group_key in reader.members():
+                        if group_key == "endpoints":
+                            for endpoint_name in reader.members():
+                                endpoint = reader.value()
+                                durations.append(endpoint.get("duration_ms"))
+                                rows.write(render_endpoint(endpoint_name, endpoint))
+                        elif group_key == "group_summary":
+                            group_summary = reader.value()
+                        else:
+                            reader.value()
+                    f_out.write(render_group_header(group_name, group_summary))
+                    f_out.write(rows.getvalue())
+                    f_out.write(render_group_footer(durations))
+            elif key == "stats":
+                stats = reader.value()
+            else:
+                reader.value()
+        if stats:
+            f_out.write(render_stats(stats))
+        f_out.write("</body></html>\n")
+
+
+def read_endpoints(input_path):
+    """
+    Streams the endpoints of a report as (group name, endpoint name, endpoint) tuples,
+    the stats of the report are stored in the "stats" entry of the returned info dictionary.
+    """
+    info = {"stats": {}}
+
+    def generate():
+        with open(input_path, "r") as f:
+            reader = JsonStreamReader(f)
+            for key in reader.members():
+                if key == "result":
+                    for group_name in reader.members():
+                        for group_key in reader.members():
+                            if group_key == "endpoints":
+                                for endpoint_name in reader.members():
+                                    yield group_name, endpoint_name, reader.value()
+                            else:
+                                reader.value()
+                elif key == "stats":
+                    info["stats"] = reader.value()
+                else:
+                    reader.value()
+
+    return generate(), info
+
+
+def main_compare(input_paths, output_path=None):
+    """
+    Renders one matrix page of several reports (e.g. several backends, or one backend over time),
+    with a row per endpoint and a column per report.
+    """
+    # (group, endpoint) -> {column: state}, filled in one pass over every report
+    index = {}
+    methods = {}
+    columns = []
+    for column, input_path in enumerate(input_paths):
+        endpoints, info = read_endpoints(input_path)
+        for group_name, endpoint_name, endpoint in endpoints:
+            key = (group_name, endpoint_name)
+            index.setdefault(key, {})[column] = endpoint.get("state", "")
+            methods.setdefault(key, endpoint.get("type", ""))
+        stats = info["stats"]
+        columns.append({
+            "name": os.path.basename(input_path),
+            "backend": stats.get("backend", {}).get("url", ""),
+            "start": stats.get("execution", {}).get("start", "")
+        })
+
+    output = open(output_path, "w", buffering=BUFFER_SIZE) if output_path else sys.stdout
+    with output as f:
+        f.write("<!DOCTYPE html>\n<html>\n")
+        f.write(STYLE)
+        f.write("<body>\n<table>\n")
+        f.write("<thead><tr><th>group</th><th>name</th><th>method</th>{ths}</tr></thead>\n".format(ths="".join(
+            "<th>{n}<br><small>{b}<br>{t}</small></th>".format(n=c["name"], b=c["backend"], t=c["start"])
+            for c in columns
+        )))
+        valid = [0] * len(columns)
+        for key in sorted(index):
+            states = index[key]
+            cells = []
+            for column in range(len(columns)):
+                state = states.get(column)
+                if state is None:
+                    cells.append("<td></td>")
+                    continue
+                if state == "Valid":
+                    valid[column] += 1
+                cells.append('<td class="state state-{s}">{s}</td>'.format(s=state.lower()))
+            f.write("<tr><td>{g}</td><td>{n}</td><td><code>{m}</code></td>{cells}</tr>\n".format(
+                g=key[0], n=key[1], m=methods[key], cells="".join(cells)
+            ))
+        f.write("<tfoot><tr><th colspan=\"3\">valid</th>{tds}</tr></tfoot>\n".format(tds="".join(
+            "<th>{v} / {n}</th>".format(v=valid[column], n=len([s for s in index.values() if column in s]))
+            for column in range(len(columns))
+        )))
+        f.write("</table>\n</body></html>\n")
+
+
+def _convert(paths):
+    main_stream(*paths)
+    return paths[1]
+
+
+def main_batch(input_dir, output_dir, jobs=None):
+    """
+    Converts every JSON report in input_dir to a HTML report with the same name in output_dir,
+    using a pool of jobs processes.
+    """
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    paths = [
+        (os.path.join(input_dir, name), os.path.join(output_dir, os.path.splitext(name)[0] + ".html"))
+        for name in sorted(os.listdir(input_dir)) if name.endswith(".json")
+    ]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for output_path in executor.map(_convert, paths):
+            print(output_path)
+
+
 if __name__ == '__main__':
-    main(*sys.argv[1:])
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stream", action="store_true",
+                        help="convert incrementally, for very large reports")
+    parser.add_argument("--batch", action="store_true",
+                        help="convert all JSON reports of the input directory into the output directory")
+    parser.add_argument("--jobs", type=int, default=None, help="number of processes in batch mode")
+    parser.add_argument("--compare", nargs="+", metavar="REPORT",
+                        help="render one matrix page comparing the endpoint states of several reports")
+    parser.add_argument("-o", "--output-file", help="output HTML file of the comparison (defaults to stdout)")
+    parser.add_argument("input", nargs="?", help="input JSON file or directory (defaults to stdin)")
+    parser.add_argument("output", nargs="?", help="output HTML file or directory (defaults to stdout)")
+    args = parser.parse_args()
+
+    if args.compare:
+        main_compare(args.compare, args.output_file)
+    elif args.batch:
+        if not args.input or not args.output:
+            parser.error("--batch requires an input and an output directory")
+        main_batch(args.input, args.output, jobs=args.jobs)
+    elif args.stream:
+        main_stream(args.input, args.output)
+    else:
+        main(args.input, args.output)
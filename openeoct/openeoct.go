@@ -102,8 +102,17 @@ type ComplianceTest struct {
 	password     string
 	output       string
 	debug        bool
+	stdout       bool
+	stream       bool
 	router       *openapi3filter.Router
 	capabilities Capability
+	timing       *RequestTiming
+}
+
+// Timing of the last request sent to the back end
+type RequestTiming struct {
+	duration time.Duration
+	size     int
 }
 
 // Elements of the Config file
@@ -171,7 +180,7 @@ func (ct *ComplianceTest) validateAll() (map[string](map[string]string), *ErrorM
 		authentication_err = nil
 	}
 
-	for _, endpoints := range ct.endpoints {
+	for group, endpoints := range ct.endpoints {
 		//Sorting within the group
 		sort.Sort(ByOrder(endpoints))
 
@@ -181,16 +190,21 @@ func (ct *ComplianceTest) validateAll() (map[string](map[string]string), *ErrorM
 				states[endpoint.Id]["message"] = "Endpoint skipped, not listed in backend capabilities"
 				states[endpoint.Id]["state"] = "NotSupported"
 				//log.Println("Endpoint missing: " + endpoint.Id)
+				ct.streamState(group, endpoint, states[endpoint.Id])
 				continue
 			}
 			//log.Println("Group: " + group + ", Endpoint: " + endpoint.Id)
 			endpoint.loadVariablesToEndpoint(*ct)
 			counter := 0 // max tries are 10
+			retries := 0
+			ct.timing = nil
 			state, err := ct.validate(endpoint, token)
 			if state == "Retry" {
 
 				for counter < 10 {
 
+					ct.timing = nil
+					retries++
 					state, err = ct.validate(endpoint, token)
 					if state != "Retry" {
 						break
@@ -212,12 +226,39 @@ func (ct *ComplianceTest) validateAll() (map[string](map[string]string), *ErrorM
 			} else {
 				states[endpoint.Id]["message"] = ""
 			}
+			// Timing of the last attempt, if a request was sent
+			if ct.timing != nil {
+				states[endpoint.Id]["duration_ms"] = strconv.FormatInt(ct.timing.duration.Milliseconds(), 10)
+				states[endpoint.Id]["size"] = strconv.Itoa(ct.timing.size)
+				states[endpoint.Id]["retries"] = strconv.Itoa(retries)
+			}
+			ct.streamState(group, endpoint, states[endpoint.Id])
 			time.Sleep(time.Duration(endpoint.Wait) * time.Second)
 		}
 	}
 	return states, authentication_err
 }
 
+// Writes the state of a validated endpoint as one JSON line to stdout, if the stream flag is set
+func (ct *ComplianceTest) streamState(group string, endpoint Endpoint, state map[string]string) {
+	if !ct.stream {
+		return
+	}
+	line, _ := json.Marshal(map[string]string{
+		"event":       "endpoint",
+		"group":       group,
+		"id":          endpoint.Id,
+		"url":         endpoint.Url,
+		"type":        endpoint.Request_type,
+		"state":       state["state"],
+		"message":     state["message"],
+		"duration_ms": state["duration_ms"],
+		"size":        state["size"],
+		"retries":     state["retries"],
+	})
+	os.Stdout.Write(append(line, '\n'))
+}
+
 func loadVariable(value string, variables map[string]string) string {
 	var_name := GetStringInBetween(value, "{", "}")
 	if var_name != "" {
@@ -480,9 +521,11 @@ func (ct *ComplianceTest) validate(endpoint Endpoint, token string) (string, *Er
 		return "Error", errReq
 	}
 
+	request_start := time.Now()
 	resp, err := client.Do(execReq)
 
 	if err != nil {
+		ct.timing = &RequestTiming{duration: time.Since(request_start)}
 		errormsg := new(ErrorMessage)
 		errormsg.input = string(execReq.Method) + "  " + string(endpoint.Url)
 		errormsg.msg = "Error sending request to back end"
@@ -492,6 +535,7 @@ func (ct *ComplianceTest) validate(endpoint Endpoint, token string) (string, *Er
 
 	// Get Response
 	body, err := ioutil.ReadAll(resp.Body)
+	ct.timing = &RequestTiming{duration: time.Since(request_start), size: len(body)}
 
 	if ct.debug == true {
 		log.Println("---Response---")
@@ -890,6 +934,14 @@ func main() {
 			Name:  "debug",
 			Usage: "activate debug info",
 		},
+		&cli.BoolFlag{
+			Name:  "stdout",
+			Usage: "write the JSON results to stdout instead of the output file",
+		},
+		&cli.BoolFlag{
+			Name:  "stream",
+			Usage: "write the state of every endpoint as one JSON line to stdout as soon as it is validated, the results are written to the output file as well",
+		},
 	}
 	// add config command
 	app.Commands = []*cli.Command{
@@ -906,6 +958,12 @@ func main() {
 				if c.Bool("debug") {
 					ct.debug = true
 				}
+				if c.Bool("stdout") {
+					ct.stdout = true
+				}
+				if c.Bool("stream") {
+					ct.stream = true
+				}
 				//log.Println("Configfile1: ", config.Url)
 				return nil
 			},
@@ -992,8 +1050,21 @@ func main() {
 
 	output := ReturnConfigValue(ct.output)
 
-	// Write to log stdout or to output file
-	if output == "" {
+	// Write to stdout, log or to output file
+	if ct.stream {
+		line, _ := json.Marshal(map[string]interface{}{
+			"event":  "result",
+			"result": result_json["result"],
+			"stats":  result_json["stats"],
+		})
+		os.Stdout.Write(append(line, '\n'))
+		// the results are kept in the output file as well, e.g. for the html report and the exports
+		if output != "" {
+			ioutil.WriteFile(output, jsonString, 0644)
+		}
+	} else if ct.stdout {
+		os.Stdout.Write(jsonString)
+	} else if output == "" {
 		log.Println(string(jsonString))
 	} else {
 		ioutil.WriteFile(output, jsonString, 0644)